@@ -0,0 +1,67 @@
+"""baseline: schema criado por create_all + colunas adicionadas desde então
+
+Até esta revisão o schema vinha de Base.metadata.create_all (main.py) e de
+ALTERs avulsos em scripts/fix_db.py. Esta baseline cobre os dois cenários:
+banco novo (cria as tabelas) e banco existente (adiciona o que faltar, de
+forma idempotente). Migrações seguintes também devem ser idempotentes, pois
+num banco novo o create_all já cria o schema atual dos modelos.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+from app.core.database import Base
+from app.models import user, integration, comment  # noqa: F401
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = {
+    "agent_configs": [
+        "auto_mode BOOLEAN DEFAULT TRUE",
+        "approval_required BOOLEAN DEFAULT FALSE",
+        "working_hours_start VARCHAR(5) DEFAULT '00:00'",
+        "working_hours_end VARCHAR(5) DEFAULT '23:59'",
+        "working_days JSON DEFAULT '[0, 1, 2, 3, 4, 5, 6]'",
+        "blacklist_words JSON DEFAULT '[]'",
+        "whitelist_channels JSON DEFAULT '[]'",
+        "respond_to_praise BOOLEAN DEFAULT TRUE",
+        "respond_to_questions BOOLEAN DEFAULT TRUE",
+        "respond_to_neutral BOOLEAN DEFAULT TRUE",
+        "respond_to_criticism BOOLEAN DEFAULT TRUE",
+        "skip_spam BOOLEAN DEFAULT TRUE",
+        "skip_offensive BOOLEAN DEFAULT TRUE",
+        "max_responses_per_run INTEGER DEFAULT 10",
+        "max_comments_per_hour INTEGER DEFAULT 10",
+        "response_delay_minutes INTEGER DEFAULT 0",
+    ],
+    "comments": [
+        "content_hash VARCHAR(64)",
+    ],
+    "social_integrations": [
+        "last_comment_published_at TIMESTAMP WITH TIME ZONE",
+    ],
+}
+
+
+def upgrade():
+    Base.metadata.create_all(bind=op.get_bind())  # checkfirst: só cria o que não existe
+
+    for table, columns in NEW_COLUMNS.items():
+        for column in columns:
+            op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column}")
+
+    op.execute("CREATE INDEX IF NOT EXISTS ix_comments_content_hash ON comments (content_hash)")
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_daily_stats_integration_date "
+        "ON daily_stats (integration_id, date)"
+    )
+
+
+def downgrade():
+    # Baseline: não há volta para o schema sem migrações
+    pass
@@ -0,0 +1,49 @@
+"""índices para as consultas quentes (agent_runner, comments, scheduler, admin)
+
+Criados com CREATE INDEX CONCURRENTLY (fora de transação) para não travar
+escrita em produção. Conferir os planos com scripts/check_query_plans.py.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (nome, tabela, colunas, condição parcial)
+INDEXES = [
+    # comments.list_comments: integration_id IN (...) ORDER BY created_at DESC
+    ("ix_comments_integration_created", "comments", ["integration_id", "created_at"], None),
+    # comments.list_comments com filtro de categoria
+    ("ix_comments_integration_category_created", "comments", ["integration_id", "category", "created_at"], None),
+    # quota.reconcile / admin: respostas enviadas por período
+    ("ix_responses_status_sent_at", "responses", ["status", "sent_at"], None),
+    # integrações do usuário (dashboard, listagem, limite do plano)
+    ("ix_social_integrations_user_active", "social_integrations", ["user_id", "is_active"], None),
+    # scheduler: só integrações ativas
+    ("ix_social_integrations_active", "social_integrations", ["id"], "is_active"),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
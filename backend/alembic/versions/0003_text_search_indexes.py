@@ -0,0 +1,46 @@
+"""busca de comentários: full-text (português) e trigramas
+
+Índices GIN sobre to_tsvector('portuguese', text) e text gin_trgm_ops em
+comments e responses, usados por app/core/search.py. Criados com
+CONCURRENTLY, como em 0002.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# (nome, tabela, expressão)
+INDEXES = [
+    ("ix_comments_text_fts", "comments", "to_tsvector('portuguese', text)"),
+    ("ix_comments_text_trgm", "comments", "text gin_trgm_ops"),
+    ("ix_responses_text_fts", "responses", "to_tsvector('portuguese', text)"),
+    ("ix_responses_text_trgm", "responses", "text gin_trgm_ops"),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        for name, table, expression in INDEXES:
+            op.create_index(
+                name,
+                table,
+                [sa.text(expression)],
+                postgresql_using="gin",
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,28 @@
+"""polling adaptativo: taxa de chegada, intervalo escolhido e próxima execução
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    "comment_rate_per_hour DOUBLE PRECISION DEFAULT 0",
+    "poll_interval_seconds INTEGER",
+    "next_run_at TIMESTAMP WITH TIME ZONE",
+]
+
+
+def upgrade():
+    for column in COLUMNS:
+        op.execute(f"ALTER TABLE social_integrations ADD COLUMN IF NOT EXISTS {column}")
+
+
+def downgrade():
+    for column in reversed(COLUMNS):
+        op.execute(f"ALTER TABLE social_integrations DROP COLUMN IF EXISTS {column.split()[0]}")
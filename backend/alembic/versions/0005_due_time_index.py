@@ -0,0 +1,35 @@
+"""índice de vencimento do scheduler (next_run_at das integrações ativas)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_social_integrations_due",
+            "social_integrations",
+            ["next_run_at"],
+            postgresql_concurrently=True,
+            postgresql_where=sa.text("is_active"),
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_social_integrations_due",
+            table_name="social_integrations",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,23 @@
+"""status "queued" das respostas (etapa de envio do pipeline)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ALTER TYPE ... ADD VALUE não pode rodar dentro de transação em Postgres antigos
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE responsestatus ADD VALUE IF NOT EXISTS 'queued'")
+
+
+def downgrade():
+    # Postgres não remove valores de enum; respostas "queued" viram "failed"
+    op.execute("UPDATE responses SET status = 'failed' WHERE status = 'queued'")
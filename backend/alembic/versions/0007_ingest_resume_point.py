@@ -0,0 +1,27 @@
+"""ponto de retomada da ingestão interrompida (limite de páginas ou quota)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    "resume_page_token VARCHAR(255)",
+    "resume_published_at TIMESTAMP WITH TIME ZONE",
+]
+
+
+def upgrade():
+    for column in COLUMNS:
+        op.execute(f"ALTER TABLE social_integrations ADD COLUMN IF NOT EXISTS {column}")
+
+
+def downgrade():
+    for column in reversed(COLUMNS):
+        op.execute(f"ALTER TABLE social_integrations DROP COLUMN IF EXISTS {column.split()[0]}")
@@ -138,6 +138,15 @@ def get_system_status(admin: User = Depends(get_current_admin_user)):
         "scheduler": "active" if worker_status == "online" else "inactive"
     }
 
+@router.get("/ai-cache")
+def get_ai_cache_stats(admin: User = Depends(get_current_admin_user)):
+    """Contadores de hit/miss dos caches da IA."""
+    from app.core.ai import classification_cache, reply_cache
+    return {
+        "reply_cache": reply_cache.cache_stats(),
+        "classification_cache": classification_cache.cache_stats(),
+    }
+
 @router.get("/plans", response_model=List[PlanOut])
 def get_plans(
     db: Session = Depends(get_db),
@@ -1,86 +1,185 @@
-from typing import List, Optional
+import base64
+import hashlib
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import redis
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, literal, tuple_
 
 from app.core.database import get_db
 from app.api.v1.auth import get_current_user
 from app.models.user import User
 from app.models.integration import SocialIntegration
-from app.models.comment import Comment, Response as CommentResponse, ResponseStatus
-from app.schemas.schemas import CommentOut, DashboardStats, DailyStatOut
+from app.models.comment import Comment, Response as CommentResponse, ResponseStatus, DailyStat
+from app.core import pacing, quota
+from app.core.redis_client import get_redis
+from app.core.search import search_condition, search_rank
+from app.core.stats import today_str
+from app.schemas.schemas import ApproveRequest, CommentPage, DashboardStats, DailyStatOut
 
 router = APIRouter(prefix="/comments", tags=["comments"])
 
 
-@router.get("/", response_model=List[CommentOut])
-def list_comments(
-    platform: Optional[str] = None,
+TOTAL_CACHE_TTL = 60  # segundos
+
+
+def encode_cursor(created_at: datetime, comment_id: str, rank: Optional[float] = None) -> str:
+    """Cursor opaco com a posição ([relevância,] created_at, id) do último item da página."""
+    data = {"c": created_at.isoformat(), "i": comment_id}
+    if rank is not None:
+        data["r"] = rank
+    raw = json.dumps(data).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str, Optional[float]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        rank = float(data["r"]) if "r" in data else None
+        return datetime.fromisoformat(data["c"]), str(data["i"]), rank
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _cached_total(q, user_id: str, filters: dict) -> int:
+    """count() da consulta, guardado no Redis por TOTAL_CACHE_TTL segundos."""
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    key = f"replyai:comments_total:{user_id}:{digest}"
+    r = get_redis()
+    try:
+        cached = r.get(key)
+        if cached is not None:
+            return int(cached)
+    except redis.RedisError:
+        pass
+
+    total = q.order_by(None).count()
+    try:
+        r.set(key, total, ex=TOTAL_CACHE_TTL)
+    except redis.RedisError:
+        pass
+    return total
+
+
+def user_integrations_query(db: Session, user_id: str):
+    """IDs das integrações do usuário."""
+    return db.query(SocialIntegration.id).filter(SocialIntegration.user_id == user_id)
+
+
+def stats_totals_query(db: Session, integration_ids: List[str]):
+    """Totais de comentários recebidos e respostas enviadas, somados dos rollups diários."""
+    return db.query(
+        func.coalesce(func.sum(DailyStat.comments_received), 0),
+        func.coalesce(func.sum(DailyStat.responses_sent), 0),
+    ).filter(DailyStat.integration_id.in_(integration_ids))
+
+
+def comments_query(
+    db: Session,
+    integration_ids: List[str],
     category: Optional[str] = None,
     status: Optional[str] = None,
     search: Optional[str] = None,
-    page: int = Query(1, ge=1),
-    limit: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
 ):
-    # Pegar IDs de integrações do usuário
-    integration_ids = [
-        i.id for i in db.query(SocialIntegration.id).filter(
-            SocialIntegration.user_id == current_user.id
-        ).all()
-    ]
-
+    """Comentários das integrações com os filtros da caixa de entrada (sem ordem nem cursor)."""
     q = db.query(Comment).options(joinedload(Comment.response)).filter(
         Comment.integration_id.in_(integration_ids)
     )
-
     if category:
         q = q.filter(Comment.category == category)
     if search:
-        q = q.filter(Comment.text.ilike(f"%{search}%"))
+        q = q.filter(search_condition(search, integration_ids))
     if status and status in [s.value for s in ResponseStatus]:
         q = q.join(Comment.response).filter(CommentResponse.status == status)
+    return q
 
-    total = q.count()
-    items = q.order_by(desc(Comment.created_at)).offset((page - 1) * limit).limit(limit).all()
-    return items
 
+def page_query(
+    q,
+    search: Optional[str] = None,
+    position: Optional[Tuple[datetime, str, Optional[float]]] = None,
+    limit: int = 20,
+):
+    """Uma página keyset da consulta: linhas (Comment, relevância), limit + 1 para saber se há próxima.
 
-@router.get("/stats", response_model=DashboardStats)
-def dashboard_stats(
+    position é o ([relevância,] created_at, id) do último item da página
+    anterior, como em decode_cursor.
+    """
+    rank = search_rank(search) if search else literal(None)
+    if position:
+        created_at, comment_id, last_rank = position
+        if search:
+            q = q.filter(tuple_(rank, Comment.created_at, Comment.id) < (last_rank, created_at, comment_id))
+        else:
+            q = q.filter(tuple_(Comment.created_at, Comment.id) < (created_at, comment_id))
+
+    order = [desc(Comment.created_at), desc(Comment.id)]
+    if search:
+        order.insert(0, desc(rank))
+    return q.add_columns(rank).order_by(*order).limit(limit + 1)
+
+
+@router.get("/", response_model=CommentPage)
+def list_comments(
+    platform: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    from datetime import datetime, timezone, date
+    """Lista paginada por cursor (keyset em created_at, id), do mais novo ao mais antigo.
 
-    integration_ids = [
-        i.id for i in db.query(SocialIntegration.id).filter(
-            SocialIntegration.user_id == current_user.id
-        ).all()
-    ]
+    Cada página custa o mesmo que a primeira: o cursor vira um filtro
+    (created_at, id) < (c, i) servido pelo índice, sem OFFSET. Com `search`,
+    a busca cobre o texto do comentário e da resposta, e a ordem passa a ser
+    por relevância (a relevância entra no cursor).
+    """
+    # Pegar IDs de integrações do usuário
+    integration_ids = [i.id for i in user_integrations_query(db, current_user.id).all()]
 
-    today_str = date.today().isoformat()
+    q = comments_query(db, integration_ids, category=category, status=status, search=search)
 
-    total_comments = db.query(func.count(Comment.id)).filter(
-        Comment.integration_id.in_(integration_ids)
-    ).scalar() or 0
+    total = None
+    if include_total:
+        total = _cached_total(
+            q, current_user.id, {"category": category, "status": status, "search": search}
+        )
 
-    total_responses = db.query(func.count(CommentResponse.id)).join(Comment).filter(
-        Comment.integration_id.in_(integration_ids),
-        CommentResponse.status == ResponseStatus.sent
-    ).scalar() or 0
+    position = None
+    if cursor:
+        position = decode_cursor(cursor)
+        if search and position[2] is None:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    rows = page_query(q, search=search, position=position, limit=limit).all()
 
-    today_comments = db.query(func.count(Comment.id)).filter(
-        Comment.integration_id.in_(integration_ids),
-        func.date(Comment.created_at) == today_str
-    ).scalar() or 0
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, last_rank = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id, last_rank)
 
-    today_responses = db.query(func.count(CommentResponse.id)).join(Comment).filter(
-        Comment.integration_id.in_(integration_ids),
-        CommentResponse.status == ResponseStatus.sent,
-        func.date(CommentResponse.sent_at) == today_str
-    ).scalar() or 0
+    return CommentPage(items=[comment for comment, _ in rows], next_cursor=next_cursor, total=total)
+
+
+@router.get("/stats", response_model=DashboardStats)
+def dashboard_stats(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    integration_ids = [i.id for i in user_integrations_query(db, current_user.id).all()]
+
+    # Lê dos rollups diários (DailyStat), não das tabelas de comentários/respostas
+    totals = stats_totals_query(db, integration_ids)
+    total_comments, total_responses = totals.one()
+    today_comments, today_responses = totals.filter(DailyStat.date == today_str()).one()
 
     active_integrations = db.query(func.count(SocialIntegration.id)).filter(
         SocialIntegration.user_id == current_user.id,
@@ -99,6 +198,70 @@ def dashboard_stats(
     )
 
 
+@router.get("/stats/daily", response_model=List[DailyStatOut])
+def daily_stats(
+    days: int = Query(30, ge=1, le=365),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Série diária (somada entre as integrações do usuário) a partir dos rollups."""
+    from datetime import timedelta, timezone
+
+    integration_ids = [i.id for i in user_integrations_query(db, current_user.id).all()]
+    since = (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).isoformat()
+
+    rows = db.query(
+        DailyStat.date,
+        func.sum(DailyStat.comments_received),
+        func.sum(DailyStat.responses_sent),
+        func.sum(DailyStat.responses_failed),
+        func.sum(DailyStat.responses_skipped),
+        func.sum(DailyStat.tokens_consumed),
+    ).filter(
+        DailyStat.integration_id.in_(integration_ids),
+        DailyStat.date >= since,
+    ).group_by(DailyStat.date).order_by(DailyStat.date).all()
+
+    return [
+        DailyStatOut(
+            date=day,
+            comments_received=received or 0,
+            responses_sent=sent or 0,
+            responses_failed=failed or 0,
+            responses_skipped=skipped or 0,
+            tokens_consumed=tokens or 0,
+        )
+        for day, received, sent, failed, skipped, tokens in rows
+    ]
+
+
+@router.patch("/approve", status_code=200)
+def approve_responses(
+    payload: ApproveRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Aprova de uma vez várias respostas pendentes; o envio sai em lotes por canal."""
+    rows = db.query(CommentResponse.id, SocialIntegration).join(
+        Comment, Comment.id == CommentResponse.comment_id
+    ).join(
+        SocialIntegration, SocialIntegration.id == Comment.integration_id
+    ).filter(
+        Comment.id.in_(payload.comment_ids),
+        SocialIntegration.user_id == current_user.id,
+        CommentResponse.status == ResponseStatus.pending,
+    ).order_by(Comment.received_at, Comment.created_at).all()
+
+    by_integration = {}
+    for response_id, integration in rows:
+        by_integration.setdefault(integration.id, (integration, []))[1].append(response_id)
+
+    from app.tasks.agent_runner import schedule_send_batches, send_approved_replies
+    for integration, response_ids in by_integration.values():
+        schedule_send_batches(send_approved_replies, integration, response_ids)
+    return {"message": f"{len(rows)} resposta(s) aprovada(s) e enfileirada(s) para envio", "approved": len(rows)}
+
+
 @router.patch("/{comment_id}/approve", status_code=200)
 def approve_response(
     comment_id: str,
@@ -115,9 +278,13 @@ def approve_response(
     if not comment.response or comment.response.status != ResponseStatus.pending:
         raise HTTPException(status_code=400, detail="Nenhuma resposta pendente")
 
-    # Enfileira envio como task Celery
+    # Enfileira envio como task Celery, no ritmo de envio do canal
     from app.tasks.agent_runner import send_single_reply
-    send_single_reply.delay(str(comment.response.id))
+    integration = comment.integration
+    send_single_reply.apply_async(
+        args=[str(comment.response.id)],
+        countdown=pacing.reserve_send_slot(pacing.channel_key(integration.platform, integration.channel_id)),
+    )
     return {"message": "Resposta aprovada e enfileirada para envio"}
 
 
@@ -136,6 +303,7 @@ def reject_response(
 
     comment.response.status = ResponseStatus.rejected
     db.commit()
+    quota.settle_queued(comment.integration_id, [comment.response.id])  # se estava na fila de envio
     return {"message": "Resposta rejeitada"}
 
 
@@ -5,11 +5,13 @@ from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 
 from app.core.database import get_db
 from app.core.config import settings
 from app.core.security import encrypt_token, decrypt_token
+from app.core.credentials import expiry_from
+from app.core import youtube_quota
+from app.core.youtube import build_youtube
 from app.api.v1.auth import get_current_user
 from app.models.user import User
 from app.models.integration import SocialIntegration, AgentConfig, Platform, AgentTone
@@ -118,8 +120,9 @@ def youtube_callback(
     creds = flow.credentials
 
     # Obter info do canal
-    youtube = build("youtube", "v3", credentials=creds)
+    youtube = build_youtube(creds)
     channel_resp = youtube.channels().list(part="snippet", mine=True).execute()
+    youtube_quota.record("channels.list")
     channel_info = channel_resp.get("items", [{}])[0]
     channel_id = channel_info.get("id", "")
     channel_name = channel_info.get("snippet", {}).get("title", "")
@@ -136,6 +139,7 @@ def youtube_callback(
         # Atualiza tokens
         existing.access_token_enc = encrypt_token(creds.token)
         existing.refresh_token_enc = encrypt_token(creds.refresh_token or "")
+        existing.token_expires_at = expiry_from(creds)
         existing.is_active = False  # INICIA DESLIGADO POR PADRÃO
         db.commit()
     else:
@@ -148,6 +152,7 @@ def youtube_callback(
             channel_avatar=channel_avatar,
             access_token_enc=encrypt_token(creds.token),
             refresh_token_enc=encrypt_token(creds.refresh_token or ""),
+            token_expires_at=expiry_from(creds),
             is_active=False,  # INICIA DESLIGADO POR PADRÃO
         )
         db.add(integration)
@@ -197,8 +202,11 @@ def update_agent_config(
         raise HTTPException(status_code=404, detail="Integração/config não encontrada")
 
     config = integration.agent_config
-    for field, value in body.model_dump(exclude_none=True).items():
+    changes = body.model_dump(exclude_none=True)
+    for field, value in changes.items():
         setattr(config, field, value)
+    if changes.keys() & {"working_hours_start", "working_hours_end", "working_days"}:
+        integration.next_run_at = None  # o scheduler reavalia a janela no próximo tick
     db.commit()
     db.refresh(config)
     return config
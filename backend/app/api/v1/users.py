@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.api.v1.auth import get_current_user
 from app.models.user import User, Plan
+from app.models.integration import SocialIntegration
 from app.schemas.schemas import UserOut, UserUpdateRequest, PlanOut
 from typing import List
 
@@ -20,8 +21,14 @@ def update_me(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    for field, value in body.model_dump(exclude_none=True).items():
+    changes = body.model_dump(exclude_none=True)
+    for field, value in changes.items():
         setattr(current_user, field, value)
+    if "timezone" in changes:
+        # Janelas de atendimento mudam de fuso: o scheduler as reavalia no próximo tick
+        db.query(SocialIntegration).filter(
+            SocialIntegration.user_id == current_user.id
+        ).update({SocialIntegration.next_run_at: None}, synchronize_session=False)
     db.commit()
     db.refresh(current_user)
     return current_user
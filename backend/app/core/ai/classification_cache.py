@@ -0,0 +1,62 @@
+"""Cache de classificação por hash do conteúdo do comentário.
+
+Evita reclassificar comentários que voltam em execuções seguintes (pulados
+por quota) e textos idênticos em integrações diferentes. Falhas do Redis são
+tratadas como miss.
+"""
+from typing import Dict, List
+
+import redis
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+KEY_PREFIX = "replyai:class_cache"
+HITS_KEY = f"{KEY_PREFIX}:hits"
+MISSES_KEY = f"{KEY_PREFIX}:misses"
+
+
+def get_categories(digests: List[str]) -> Dict[str, str]:
+    """Retorna {hash: categoria} para os hashes presentes no cache."""
+    if not digests or not settings.AI_CLASSIFY_CACHE_ENABLED:
+        return {}
+    r = get_redis()
+    try:
+        values = r.mget([f"{KEY_PREFIX}:{d}" for d in digests])
+        found = {d: v for d, v in zip(digests, values) if v}
+        pipe = r.pipeline(transaction=False)
+        if found:
+            pipe.incrby(HITS_KEY, len(found))
+        if len(found) < len(digests):
+            pipe.incrby(MISSES_KEY, len(digests) - len(found))
+        pipe.execute()
+        return found
+    except redis.RedisError:
+        return {}
+
+
+def store_categories(categories: Dict[str, str]):
+    if not categories or not settings.AI_CLASSIFY_CACHE_ENABLED:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for digest, category in categories.items():
+            pipe.set(f"{KEY_PREFIX}:{digest}", category, ex=settings.AI_CLASSIFY_CACHE_TTL)
+        pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+def cache_stats() -> dict:
+    try:
+        hits, misses = get_redis().mget(HITS_KEY, MISSES_KEY)
+    except redis.RedisError:
+        return {"available": False}
+    hits, misses = int(hits or 0), int(misses or 0)
+    total = hits + misses
+    return {
+        "available": True,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total * 100, 1) if total else 0.0,
+    }
@@ -1,4 +1,11 @@
-from openai import OpenAI
+import json
+from typing import Dict, List, Optional
+
+from app.core.ai import classification_cache
+from app.core.ai.gateway import TokenUsage, chat_completion
+from app.core.ai.normalize import content_hash
+from app.core.ai.prefilter import confident_category
+from app.core.config import settings
 
 ALLOWED_CATEGORIES = {
     "elogio", "duvida", "critica", "discordancia",
@@ -6,8 +13,33 @@ ALLOWED_CATEGORIES = {
 }
 
 
-def classify_comment(comment: str, language: str = "pt-BR") -> str:
-    client = OpenAI()
+def classify_comment(
+    comment: str,
+    language: str = "pt-BR",
+    tenant_id: Optional[str] = None,
+    usage: Optional[TokenUsage] = None,
+) -> str:
+    local = confident_category(comment)
+    if local:
+        return local
+
+    digest = content_hash(comment)
+    cached = classification_cache.get_categories([digest]).get(digest)
+    if cached:
+        return cached
+
+    category = _classify_single(comment, tenant_id, usage)
+    if category:
+        classification_cache.store_categories({digest: category})
+        return category
+    return "neutro"
+
+
+def _classify_single(
+    comment: str,
+    tenant_id: Optional[str],
+    usage: Optional[TokenUsage],
+) -> Optional[str]:
     prompt = f"""Você é um classificador de comentários para redes sociais.
 
 Classifique o comentário abaixo em UMA das categorias:
@@ -19,13 +51,115 @@ Comentário:
 "{comment}"
 """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        response = chat_completion(
             messages=[{"role": "user", "content": prompt}],
+            tenant_id=tenant_id,
+            usage=usage,
             temperature=0,
             max_tokens=20,
         )
         category = response.choices[0].message.content.strip().lower()
-        return category if category in ALLOWED_CATEGORIES else "neutro"
+        return category if category in ALLOWED_CATEGORIES else None
+    except Exception:
+        return None
+
+
+def classify_comments_batch(
+    comments: List[str],
+    language: str = "pt-BR",
+    batch_size: Optional[int] = None,
+    tenant_id: Optional[str] = None,
+    usage: Optional[TokenUsage] = None,
+) -> List[str]:
+    """Classifica vários comentários com uma chamada ao LLM por lote.
+
+    Retorna uma categoria para cada comentário, na mesma ordem da entrada.
+    Itens resolvidos pelo pré-classificador local ou pelo cache de
+    classificação não vão ao LLM; itens ausentes ou inválidos na resposta
+    caem para "neutro".
+    """
+    categories = known_categories(comments)
+
+    # Textos idênticos no mesmo lote vão ao LLM uma única vez
+    by_digest: Dict[str, List[int]] = {}
+    for i, category in enumerate(categories):
+        if category is None:
+            by_digest.setdefault(content_hash(comments[i]), []).append(i)
+    pending = list(by_digest.items())
+
+    size = max(1, batch_size or settings.AI_CLASSIFY_BATCH_SIZE)
+    for start in range(0, len(pending), size):
+        group = pending[start:start + size]
+        chunk = _classify_chunk([comments[indexes[0]] for _, indexes in group], tenant_id, usage)
+        for (_, indexes), category in zip(group, chunk):
+            for i in indexes:
+                categories[i] = category
+        classification_cache.store_categories(
+            {digest: category for (digest, _), category in zip(group, chunk) if category}
+        )
+    return [category or "neutro" for category in categories]
+
+
+def known_categories(comments: List[str]) -> List[Optional[str]]:
+    """Categorias já conhecidas sem LLM (pré-classificador local ou cache); None = desconhecida."""
+    categories: List[Optional[str]] = [confident_category(text) for text in comments]
+    pending = [i for i, category in enumerate(categories) if category is None]
+    digests = {i: content_hash(comments[i]) for i in pending}
+    cached = classification_cache.get_categories(list(digests.values()))
+    for i in pending:
+        categories[i] = cached.get(digests[i])
+    return categories
+
+
+def _classify_chunk(
+    comments: List[str],
+    tenant_id: Optional[str],
+    usage: Optional[TokenUsage],
+) -> List[Optional[str]]:
+    """Classifica um lote; None nas posições sem resposta válida do LLM."""
+    if not comments:
+        return []
+    if len(comments) == 1:
+        return [_classify_single(comments[0], tenant_id, usage)]
+
+    numbered = "\n".join(
+        f"{i}. {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(comments, start=1)
+    )
+    prompt = f"""Você é um classificador de comentários para redes sociais.
+
+Classifique CADA comentário abaixo em UMA das categorias:
+elogio, duvida, critica, discordancia, ofensa, spam, neutro, pedido_de_conteudo
+
+Responda APENAS com um JSON no formato:
+{{"resultados": [{{"id": 1, "categoria": "elogio"}}, ...]}}
+com exatamente um item para cada comentário, usando o número do comentário como id.
+
+Comentários:
+{numbered}
+"""
+    categories: List[Optional[str]] = [None] * len(comments)
+    try:
+        response = chat_completion(
+            messages=[{"role": "user", "content": prompt}],
+            tenant_id=tenant_id,
+            usage=usage,
+            temperature=0,
+            max_tokens=20 * len(comments) + 50,
+            response_format={"type": "json_object"},
+        )
+        data = json.loads(response.choices[0].message.content)
     except Exception:
-        return "neutro"
+        return categories
+
+    results = data.get("resultados", []) if isinstance(data, dict) else []
+    for item in results:
+        if not isinstance(item, dict):
+            continue
+        try:
+            idx = int(item.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        category = str(item.get("categoria", "")).strip().lower()
+        if 0 <= idx < len(comments) and category in ALLOWED_CATEGORIES:
+            categories[idx] = category
+    return categories
@@ -0,0 +1,89 @@
+"""Limite de chamadas simultâneas ao LLM em toda a frota (Redis).
+
+Cada chamada ocupa uma vaga num ZSET global e, se tiver tenant, numa ZSET do
+tenant; o score é o horário em que a vaga expira sozinha. Assim os limites
+AI_GLOBAL_MAX_CONCURRENCY e AI_MAX_CONCURRENCY_PER_TENANT valem para todos os
+processos (workers do Celery e API) juntos, e a vaga de um processo que
+morreu no meio da chamada volta depois de AI_SLOT_TTL segundos.
+
+Sem Redis a chamada segue sem vaga — vale só o limite do processo
+(AI_MAX_CONCURRENCY, em app/core/ai/gateway.py).
+"""
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+import redis
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+KEY_PREFIX = "replyai:llm_slots"
+POLL_INTERVAL = 0.05  # segundos entre tentativas enquanto não há vaga
+
+# Descarta as vagas expiradas e ocupa uma vaga global (e do tenant) se couber
+_ACQUIRE = """
+local now = tonumber(ARGV[1])
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now)
+    if redis.call('ZCARD', key) >= tonumber(ARGV[3 + i]) then return 0 end
+end
+for _, key in ipairs(KEYS) do
+    redis.call('ZADD', key, ARGV[2], ARGV[3])
+    redis.call('EXPIRE', key, math.ceil(ARGV[2] - now) + 60)
+end
+return 1
+"""
+
+
+def _global_key() -> str:
+    return f"{KEY_PREFIX}:global"
+
+
+def _tenant_key(tenant_id: str) -> str:
+    return f"{KEY_PREFIX}:tenant:{tenant_id}"
+
+
+def _try_acquire(keys: list, limits: list, token: str) -> Optional[bool]:
+    """True se ocupou a vaga, False se está cheio, None sem Redis."""
+    now = time.time()
+    try:
+        acquired = get_redis().eval(
+            _ACQUIRE, len(keys), *keys, now, now + settings.AI_SLOT_TTL, token, *limits
+        )
+    except redis.RedisError:
+        return None
+    return bool(acquired)
+
+
+def _release(keys: list, token: str):
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key in keys:
+            pipe.zrem(key, token)
+        pipe.execute()
+    except redis.RedisError:
+        pass  # a vaga expira sozinha
+
+
+@contextmanager
+def llm_slot(tenant_id: Optional[str] = None):
+    """Espera uma vaga global (e do tenant) e a libera ao sair do bloco."""
+    keys = [_global_key()]
+    limits = [settings.AI_GLOBAL_MAX_CONCURRENCY]
+    if tenant_id:
+        keys.append(_tenant_key(tenant_id))
+        limits.append(settings.AI_MAX_CONCURRENCY_PER_TENANT)
+
+    token = str(uuid.uuid4())
+    acquired = _try_acquire(keys, limits, token)
+    while acquired is False:
+        time.sleep(POLL_INTERVAL * random.uniform(0.5, 1.5))
+        acquired = _try_acquire(keys, limits, token)
+    try:
+        yield
+    finally:
+        if acquired:
+            _release(keys, token)
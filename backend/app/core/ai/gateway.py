@@ -0,0 +1,133 @@
+"""Gateway único para chamadas ao LLM.
+
+Mantém um cliente OpenAI (com pool HTTP keep-alive) por processo, limita a
+concorrência, aplica retry com jitter e contabiliza os tokens consumidos.
+Todas as chamadas de IA do backend devem passar por aqui.
+
+Limites de concorrência:
+- AI_GLOBAL_MAX_CONCURRENCY e AI_MAX_CONCURRENCY_PER_TENANT valem para a
+  frota inteira (vagas no Redis, app/core/ai/concurrency.py);
+- AI_MAX_CONCURRENCY limita cada processo (e o pool HTTP do cliente).
+"""
+import os
+import random
+import threading
+import time
+from typing import List, Optional
+
+import httpx
+from openai import (
+    OpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+
+from app.core.ai.concurrency import llm_slot
+from app.core.config import settings
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
+
+
+class TokenUsage:
+    """Acumulador de tokens (prompt/completion) de uma ou mais chamadas."""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def record(self, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens or 0
+            self.completion_tokens += completion_tokens or 0
+
+    def merge(self, other: "TokenUsage"):
+        self.record(other.prompt_tokens, other.completion_tokens)
+
+
+# ──────────────────────────────────────────────
+# Cliente por processo
+# ──────────────────────────────────────────────
+_client: Optional[OpenAI] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OpenAI:
+    """Retorna o cliente OpenAI do processo atual.
+
+    O cliente é recriado se o processo mudou (fork do worker prefork do Celery),
+    para que conexões HTTP nunca sejam compartilhadas entre processos.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                http_client = httpx.Client(
+                    timeout=settings.AI_REQUEST_TIMEOUT,
+                    limits=httpx.Limits(
+                        max_connections=settings.AI_MAX_CONCURRENCY,
+                        max_keepalive_connections=settings.AI_MAX_CONCURRENCY,
+                    ),
+                )
+                _client = OpenAI(
+                    api_key=settings.OPENAI_API_KEY or None,
+                    http_client=http_client,
+                    max_retries=0,  # o retry é feito aqui, com jitter
+                )
+                _client_pid = pid
+    return _client
+
+
+# ──────────────────────────────────────────────
+# Limite de concorrência do processo (os da frota ficam em concurrency.py)
+# ──────────────────────────────────────────────
+_process_slots = threading.BoundedSemaphore(settings.AI_MAX_CONCURRENCY)
+
+
+def _backoff(attempt: int) -> float:
+    # Exponencial com "full jitter"
+    return random.uniform(0, settings.AI_RETRY_BASE_DELAY * (2 ** attempt))
+
+
+def chat_completion(
+    messages: List[dict],
+    model: str = DEFAULT_MODEL,
+    tenant_id: Optional[str] = None,
+    usage: Optional[TokenUsage] = None,
+    **kwargs,
+):
+    """Executa chat.completions.create respeitando limites e retry.
+
+    Erros não recuperáveis (ou esgotadas as tentativas) são propagados para o
+    chamador, que decide o fallback.
+    """
+    attempt = 0
+    while True:
+        try:
+            with _process_slots, llm_slot(tenant_id):
+                response = get_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    **kwargs,
+                )
+        except RETRYABLE_ERRORS:
+            if attempt >= settings.AI_MAX_RETRIES:
+                raise
+        else:
+            if usage is not None and response.usage is not None:
+                usage.record(response.usage.prompt_tokens, response.usage.completion_tokens)
+            return response
+
+        # Espera fora das vagas para não segurá-las durante o backoff
+        time.sleep(_backoff(attempt))
+        attempt += 1
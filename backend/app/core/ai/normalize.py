@@ -0,0 +1,18 @@
+import hashlib
+import re
+import unicodedata
+
+
+def normalize_text(text: str) -> str:
+    """minúsculas, sem acentos/pontuação/emojis, letras repetidas reduzidas ("topppp" -> "topp")."""
+    text = unicodedata.normalize("NFKD", text or "").lower()
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = re.sub(r"(\w)\1{2,}", r"\1\1", text)
+    return " ".join(text.split())
+
+
+def content_hash(text: str) -> str:
+    """Hash SHA-256 do conteúdo do comentário (espaços e caixa normalizados)."""
+    canonical = " ".join((text or "").split()).lower()
+    return hashlib.sha256(canonical.encode()).hexdigest()
@@ -0,0 +1,113 @@
+"""Pré-classificador local (regras + regex), executado antes do LLM.
+
+Resolve sem chamada de rede os casos óbvios — links/contatos de spam,
+comentários só com emoji, "primeiro!", textos curtíssimos e caracteres
+repetidos. Tudo que não for certo o bastante segue para o classificador LLM.
+"""
+import re
+import unicodedata
+from typing import NamedTuple, Optional
+
+from app.core.config import settings
+
+
+class PreClassification(NamedTuple):
+    category: Optional[str]   # None = incerto, deve ir para o LLM
+    confidence: float
+    rule: str
+
+
+UNCERTAIN = PreClassification(None, 0.0, "none")
+
+_URL_RE = re.compile(r"(https?://|www\.)\S+", re.IGNORECASE)
+# Domínio sem esquema nem www.: ambíguo ("Amei.Me inscrevi", "acessar o youtube.com"),
+# então só pesa abaixo de AI_PRECLASSIFY_MIN_CONFIDENCE e quem decide é o LLM
+_DOMAIN_RE = re.compile(
+    r"\b[\w-]+\.(com|net|org|io|me|ly|gg|link|site|online|shop|store|xyz)(\.br)?(/\S*)?\b",
+    re.IGNORECASE,
+)
+_CONTACT_RE = re.compile(
+    r"\b(whats\s?app|wpp|zap\s?zap|telegram|t\.me/|chama\s+no\s+(pv|privado|direct))\b"
+    r"|\+?\d{2}[\s.-]?\(?\d{2}\)?[\s.-]?\d{4,5}[\s.-]?\d{4}",
+    re.IGNORECASE,
+)
+_PROMO_RE = re.compile(
+    r"(inscrev[\w-]*\s+(no|em)\s+meu|confir\w+\s+(o\s+)?meu\s+canal|visit\w+\s+(o\s+)?meu|"
+    r"sig\w+\s+(o\s+)?meu|ganh\w+\s+dinheiro|renda\s+extra|lucr\w+\s+\w*\s*por\s+dia|"
+    r"promo[çc][ãa]o|cupom|link\s+na\s+bio|check\s+out\s+my|subscribe\s+to\s+my)",
+    re.IGNORECASE,
+)
+_FIRST_RE = re.compile(
+    r"^(first|primeiro|primeira|1st|1[ºo°]|cheguei|presente|early)[\s!.]*$",
+    re.IGNORECASE,
+)
+_LAUGH_RE = re.compile(r"^(k{3,}|(ha){2,}h?|(he){2,}h?|(rs){2,}|(ja){2,})$", re.IGNORECASE)
+_REPEATED_RE = re.compile(r"^(.)\1{3,}$")
+
+_POSITIVE_EMOJIS = set("❤♥💖💗💓💞💕💜💙💚🧡💛🤍🖤👍👏🙌🔥😍🥰😊☺😀😃😄😁🙏💯⭐🌟✨🤩😎🎉🥳💪✅🤗")
+_NEGATIVE_EMOJIS = set("👎😡🤬😠💩🤮🤢😒🙄😤💀")
+_EMOJI_JOINERS = {"\u200d", "\ufe0f", "\ufe0e"}  # ZWJ e seletores de variação
+
+
+def _is_emoji_char(ch: str) -> bool:
+    if ch in _EMOJI_JOINERS:
+        return True
+    # So = símbolos (emojis), Sk = modificadores de tom de pele
+    return unicodedata.category(ch) in ("So", "Sk")
+
+
+def pre_classify(text: str) -> PreClassification:
+    """Classifica por regras locais; retorna UNCERTAIN quando não há certeza."""
+    stripped = (text or "").strip()
+    if not stripped:
+        return PreClassification("neutro", 0.99, "empty")
+
+    # Spam: links e contatos, com peso maior quando acompanhados de texto promocional
+    has_url = bool(_URL_RE.search(stripped))
+    has_contact = bool(_CONTACT_RE.search(stripped))
+    has_promo = bool(_PROMO_RE.search(stripped))
+    has_domain = bool(_DOMAIN_RE.search(stripped))
+    if (has_url or has_contact) and has_promo:
+        return PreClassification("spam", 0.99, "promo_link")
+    if has_url or has_contact:
+        return PreClassification("spam", 0.92, "link_or_contact")
+    if has_domain and has_promo:
+        return PreClassification("spam", 0.85, "promo_domain")
+    if has_promo:
+        return PreClassification("spam", 0.8, "promo_text")
+    if has_domain:
+        return PreClassification("spam", 0.6, "bare_domain")
+
+    compact = re.sub(r"\s+", "", stripped)
+
+    # Apenas emojis
+    if all(_is_emoji_char(ch) for ch in compact):
+        emojis = {ch for ch in compact if ch not in _EMOJI_JOINERS and unicodedata.category(ch) == "So"}
+        if emojis & _NEGATIVE_EMOJIS:
+            return PreClassification(None, 0.5, "emoji_negative")
+        if emojis and emojis <= _POSITIVE_EMOJIS:
+            return PreClassification("elogio", 0.95, "emoji_positive")
+        return PreClassification("neutro", 0.9, "emoji_only")
+
+    if _FIRST_RE.match(stripped):
+        return PreClassification("neutro", 0.97, "first")
+
+    letters = re.sub(r"[\W\d_]+", "", compact)
+    if _LAUGH_RE.match(letters):
+        return PreClassification("neutro", 0.9, "laugh")
+    if _REPEATED_RE.match(compact):
+        return PreClassification("neutro", 0.95, "repeated_chars")
+    if len(letters) <= 2 and "?" not in stripped:
+        return PreClassification("neutro", 0.9, "too_short")
+
+    return UNCERTAIN
+
+
+def confident_category(text: str) -> Optional[str]:
+    """Categoria do pré-classificador, ou None se abaixo de AI_PRECLASSIFY_MIN_CONFIDENCE."""
+    if not settings.AI_PRECLASSIFY_ENABLED:
+        return None
+    result = pre_classify(text)
+    if result.category and result.confidence >= settings.AI_PRECLASSIFY_MIN_CONFIDENCE:
+        return result.category
+    return None
@@ -0,0 +1,108 @@
+"""Cache de respostas para comentários recorrentes ("amei o vídeo", "top demais").
+
+A chave é o texto normalizado + persona, tom, instrução extra e idioma. Cada
+chave guarda um pequeno conjunto rotativo de variantes para as respostas não
+ficarem repetitivas; a chave só responde do cache depois que o conjunto está
+completo. Um índice ordenado por último acesso limita o total de chaves (LRU)
+e cada chave expira após AI_REPLY_CACHE_TTL segundos sem uso.
+
+Falhas do Redis nunca interrompem o agente: são tratadas como miss.
+"""
+import hashlib
+import json
+import random
+import time
+from typing import Optional
+
+import redis
+
+from app.core.ai.normalize import normalize_text
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+KEY_PREFIX = "replyai:reply_cache"
+INDEX_KEY = f"{KEY_PREFIX}:index"
+HITS_KEY = f"{KEY_PREFIX}:hits"
+MISSES_KEY = f"{KEY_PREFIX}:misses"
+
+
+def cache_key(
+    text: str,
+    persona_name: str,
+    tone,
+    custom_prompt: Optional[str],
+    language: str,
+) -> Optional[str]:
+    """Chave do cache, ou None quando o comentário não vale a pena cachear."""
+    if not settings.AI_REPLY_CACHE_ENABLED:
+        return None
+    normalized = normalize_text(text)
+    if not normalized or len(normalized) > settings.AI_REPLY_CACHE_MAX_CHARS:
+        return None
+    raw = json.dumps(
+        [normalized, persona_name or "", getattr(tone, "value", tone) or "", custom_prompt or "", language or ""],
+        ensure_ascii=False,
+    )
+    return f"{KEY_PREFIX}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+def get_cached_reply(key: Optional[str]) -> Optional[dict]:
+    """Retorna uma variante {"category", "reply"} ou None (miss)."""
+    if not key:
+        return None
+    r = get_redis()
+    try:
+        variants = r.lrange(key, 0, -1)
+        if len(variants) < settings.AI_REPLY_CACHE_VARIANTS:
+            r.incr(MISSES_KEY)
+            return None
+        pipe = r.pipeline(transaction=False)
+        pipe.incr(HITS_KEY)
+        pipe.expire(key, settings.AI_REPLY_CACHE_TTL)
+        pipe.zadd(INDEX_KEY, {key: time.time()})
+        pipe.execute()
+        return json.loads(random.choice(variants))
+    except (redis.RedisError, ValueError):
+        return None
+
+
+def store_reply(key: Optional[str], category: Optional[str], reply: str):
+    """Adiciona uma variante gerada ao conjunto rotativo da chave."""
+    if not key or not reply:
+        return
+    r = get_redis()
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.lpush(key, json.dumps({"category": category, "reply": reply}, ensure_ascii=False))
+        pipe.ltrim(key, 0, settings.AI_REPLY_CACHE_VARIANTS - 1)
+        pipe.expire(key, settings.AI_REPLY_CACHE_TTL)
+        pipe.zadd(INDEX_KEY, {key: time.time()})
+        pipe.zcard(INDEX_KEY)
+        size = pipe.execute()[-1]
+
+        # Despejar as chaves menos usadas recentemente além do limite
+        overflow = size - settings.AI_REPLY_CACHE_MAX_KEYS
+        if overflow > 0:
+            evicted = [k for k, _ in r.zpopmin(INDEX_KEY, overflow)]
+            if evicted:
+                r.delete(*evicted)
+    except redis.RedisError:
+        pass
+
+
+def cache_stats() -> dict:
+    r = get_redis()
+    try:
+        hits, misses = r.mget(HITS_KEY, MISSES_KEY)
+        keys = r.zcard(INDEX_KEY)
+    except redis.RedisError:
+        return {"available": False}
+    hits, misses = int(hits or 0), int(misses or 0)
+    total = hits + misses
+    return {
+        "available": True,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total * 100, 1) if total else 0.0,
+        "keys": keys,
+    }
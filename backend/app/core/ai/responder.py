@@ -1,8 +1,21 @@
-from openai import OpenAI
-from typing import Optional
+import json
+from typing import Iterable, Optional, Tuple
+
+from app.core.ai import classification_cache
+from app.core.ai.classifier import ALLOWED_CATEGORIES
+from app.core.ai.gateway import TokenUsage, chat_completion
+from app.core.ai.normalize import content_hash
 
 SKIP_CATEGORIES = {"spam", "ofensa"}
 
+TONE_DESCRIPTIONS = {
+    "formal": "formal e profissional",
+    "casual": "descontraído e amigável",
+    "funny": "bem-humorado e engraçado",
+    "empathetic": "empático e acolhedor",
+    "professional": "profissional e direto ao ponto",
+}
+
 
 def generate_reply(
     comment: str,
@@ -11,19 +24,13 @@ def generate_reply(
     tone: str = "casual",
     custom_prompt: Optional[str] = None,
     language: str = "pt-BR",
+    tenant_id: Optional[str] = None,
+    usage: Optional[TokenUsage] = None,
 ) -> Optional[str]:
-    client = OpenAI()
     if category in SKIP_CATEGORIES:
         return None
 
-    tone_descriptions = {
-        "formal": "formal e profissional",
-        "casual": "descontraído e amigável",
-        "funny": "bem-humorado e engraçado",
-        "empathetic": "empático e acolhedor",
-        "professional": "profissional e direto ao ponto",
-    }
-    tone_desc = tone_descriptions.get(tone, "amigável")
+    tone_desc = TONE_DESCRIPTIONS.get(tone, "amigável")
 
     base_prompt = f"""Você é {persona_name}, responsável pela gestão de comentários nas redes sociais.
 Responda ao comentário abaixo de forma {tone_desc}, em {language}.
@@ -36,12 +43,81 @@ Contexto do comentário: {category}
     base_prompt += f'\nComentário:\n"{comment}"'
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        response = chat_completion(
             messages=[{"role": "user", "content": base_prompt}],
+            tenant_id=tenant_id,
+            usage=usage,
             temperature=0.7,
             max_tokens=150,
         )
         return response.choices[0].message.content.strip()
     except Exception:
         return None
+
+
+def classify_and_reply(
+    comment: str,
+    persona_name: str = "Assistente",
+    tone: str = "casual",
+    custom_prompt: Optional[str] = None,
+    language: str = "pt-BR",
+    skip_categories: Iterable[str] = (),
+    tenant_id: Optional[str] = None,
+    usage: Optional[TokenUsage] = None,
+) -> Tuple[str, Optional[str]]:
+    """Classifica e responde o comentário em uma única chamada ao LLM.
+
+    Retorna (categoria, resposta). A resposta é None quando a categoria está
+    em SKIP_CATEGORIES ou em skip_categories — o modelo é instruído a não
+    redigir texto nesses casos, então o comentário pulado custa só a classificação.
+    """
+    skipped = set(SKIP_CATEGORIES) | set(skip_categories)
+    tone_desc = TONE_DESCRIPTIONS.get(tone, "amigável")
+
+    prompt = f"""Você é {persona_name}, responsável pela gestão de comentários nas redes sociais.
+
+1. Classifique o comentário abaixo em UMA das categorias:
+elogio, duvida, critica, discordancia, ofensa, spam, neutro, pedido_de_conteudo
+
+2. Se a categoria for uma destas: {", ".join(sorted(skipped))}
+deixe a resposta vazia ("").
+Caso contrário, responda ao comentário de forma {tone_desc}, em {language}.
+Seja humano, conciso e genuíno. Máximo de 2-3 frases.
+"""
+    if custom_prompt:
+        prompt += f"\nInstruções adicionais: {custom_prompt}\n"
+
+    prompt += f"""
+Responda APENAS com um JSON no formato:
+{{"categoria": "<categoria>", "resposta": "<texto da resposta>"}}
+
+Comentário:
+{json.dumps(comment, ensure_ascii=False)}
+"""
+
+    try:
+        response = chat_completion(
+            messages=[{"role": "user", "content": prompt}],
+            tenant_id=tenant_id,
+            usage=usage,
+            temperature=0.7,
+            max_tokens=200,
+            response_format={"type": "json_object"},
+        )
+        data = json.loads(response.choices[0].message.content)
+    except Exception:
+        return "neutro", None
+
+    if not isinstance(data, dict):
+        return "neutro", None
+
+    category = str(data.get("categoria", "")).strip().lower()
+    if category in ALLOWED_CATEGORIES:
+        classification_cache.store_categories({content_hash(comment): category})
+    else:
+        category = "neutro"
+    if category in skipped:
+        return category, None
+
+    reply = str(data.get("resposta") or "").strip()
+    return category, reply or None
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import worker_process_init
 from app.core.config import settings
 
 celery_app = Celery(
@@ -17,11 +18,40 @@ celery_app.conf.update(
     task_track_started=True,
     task_acks_late=True,
     worker_prefetch_multiplier=1,
-    # Beat schedule — cada integração ativa roda a cada 15 min
+    # Pipeline do agente: uma fila por etapa, para dimensionar cada pool separadamente
+    # (ver os workers no docker-compose). Beat e tarefas de manutenção ficam na fila padrão.
+    task_default_queue="celery",
+    task_routes={
+        "app.tasks.agent_runner.run_agent_for_integration": {"queue": "ingest"},
+        "app.tasks.agent_runner.classify_comments": {"queue": "classify"},
+        "app.tasks.agent_runner.generate_replies": {"queue": "generate"},
+        "app.tasks.agent_runner.send_replies": {"queue": "send"},
+        "app.tasks.agent_runner.send_reply": {"queue": "send"},
+        "app.tasks.agent_runner.send_reply_batch": {"queue": "send"},
+        "app.tasks.agent_runner.send_approved_replies": {"queue": "send"},
+        "app.tasks.agent_runner.send_single_reply": {"queue": "send"},
+    },
+    # Beat schedule — o scheduler roda a cada minuto; cada integração tem seu next_run_at
     beat_schedule={
         "run-all-active-agents": {
             "task": "app.tasks.scheduler.schedule_active_agents",
             "schedule": 60.0,  # 1 minuto
         },
+        "reconcile-quota-counters": {
+            "task": "app.tasks.scheduler.reconcile_quota_counters",
+            "schedule": float(settings.QUOTA_RECONCILE_INTERVAL),
+        },
+        "refresh-expiring-tokens": {
+            "task": "app.tasks.scheduler.refresh_expiring_tokens",
+            "schedule": float(settings.TOKEN_REFRESH_INTERVAL),
+        },
     },
 )
+
+
+@worker_process_init.connect
+def _prewarm_youtube(**kwargs):
+    # Discovery e clientes do YouTube prontos antes da primeira tarefa do processo
+    from app.core import youtube
+
+    youtube.prewarm()
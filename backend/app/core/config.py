@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -26,14 +26,61 @@ class Settings(BaseSettings):
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+    QUOTA_RECONCILE_INTERVAL: int = 900     # segundos entre reconciliações com o Postgres
+    QUOTA_RECONCILE_TTL: int = 3600         # validade da última reconciliação por integração
 
     # OpenAI
     OPENAI_API_KEY: str = ""
+    AI_CLASSIFY_BATCH_SIZE: int = 20        # comentários por chamada de classificação
+    AI_COMBINED_MODE: bool = False          # classificar + responder em uma única chamada
+    AI_MAX_CONCURRENCY: int = 8             # chamadas simultâneas por processo (e conexões do pool HTTP)
+    AI_GLOBAL_MAX_CONCURRENCY: int = 32     # chamadas simultâneas em toda a frota (Redis)
+    AI_MAX_CONCURRENCY_PER_TENANT: int = 4  # chamadas simultâneas por usuário, em toda a frota (Redis)
+    AI_SLOT_TTL: int = 120                  # segundos até a vaga de uma chamada perdida expirar
+    AI_MAX_RETRIES: int = 3
+    AI_RETRY_BASE_DELAY: float = 0.5        # segundos (backoff exponencial com jitter)
+    AI_REQUEST_TIMEOUT: float = 30.0        # segundos
+    AI_PRECLASSIFY_ENABLED: bool = True     # regras locais antes do LLM
+    AI_PRECLASSIFY_MIN_CONFIDENCE: float = 0.9
+    AI_CLASSIFY_CACHE_ENABLED: bool = True
+    AI_CLASSIFY_CACHE_TTL: int = 30 * 24 * 3600  # segundos
+    AI_REPLY_CACHE_ENABLED: bool = True
+    AI_REPLY_CACHE_TTL: int = 7 * 24 * 3600  # segundos sem uso até expirar
+    AI_REPLY_CACHE_VARIANTS: int = 3         # variantes guardadas por comentário
+    AI_REPLY_CACHE_MAX_KEYS: int = 50000
+    AI_REPLY_CACHE_MAX_CHARS: int = 80       # só comentários curtos são cacheados
+
+    # Agente
+    AGENT_LLM_WORKERS: int = 8              # comentários processados em paralelo por execução
+    AGENT_LEASE_TTL: int = 120              # segundos; renovado enquanto a execução dura
+    AGENT_BACKLOG_HOURS: int = 24           # comentários sem resposta reprocessados por até N horas
+    AGENT_BACKLOG_LIMIT: int = 200          # comentários por execução do pipeline
+    AGENT_GENERATE_MAX_ATTEMPTS: int = 3    # falhas do LLM antes de marcar a resposta como failed
+    SEND_MIN_INTERVAL: float = 2.0          # segundos entre envios no mesmo canal
+    SEND_BURST: int = 10                    # envios imediatos (num só lote) antes do espaçamento
+    POLL_MIN_INTERVAL: int = 60             # segundos entre execuções de uma integração (mín.)
+    POLL_MAX_INTERVAL: int = 1800           # segundos (canais parados, fora do horário, sem quota)
+    POLL_TARGET_COMMENTS: int = 10          # comentários novos esperados por execução
+    POLL_RATE_SMOOTHING: float = 0.5        # peso da última execução na taxa de chegada (EWMA)
+    SCHEDULER_BATCH_SIZE: int = 500         # integrações vencidas retiradas por tick
+    SCHEDULER_JITTER_SECONDS: int = 50      # espalha os enfileiramentos dentro do tick
+    SCHEDULER_CLAIM_SECONDS: int = 600      # reagenda se a execução enfileirada se perder
 
     # Google / YouTube
     GOOGLE_CLIENT_ID: str = ""
     GOOGLE_CLIENT_SECRET: str = ""
     GOOGLE_REDIRECT_URI: str = "http://localhost:8000/api/v1/integrations/youtube/callback"
+    YOUTUBE_PAGE_SIZE: int = 50             # threads por página (máx. 100)
+    YOUTUBE_MAX_PAGES_PER_RUN: int = 10     # limite de paginação até o watermark
+    YOUTUBE_CLIENT_TTL: int = 1800          # segundos que um cliente autorizado é reaproveitado
+    YOUTUBE_CLIENT_CACHE_SIZE: int = 256    # clientes em cache por processo
+    YOUTUBE_PREWARM_CLIENTS: int = 20       # clientes montados na inicialização do worker
+    YOUTUBE_SEND_BATCH_SIZE: int = 10       # respostas por requisição em lote (limitado pelo SEND_BURST)
+    YOUTUBE_DAILY_QUOTA: int = 10000        # unidades/dia do projeto no Google (zera à meia-noite do Pacífico)
+    YOUTUBE_QUOTA_PLAN_WEIGHTS: Dict[str, float] = {"free": 1, "starter": 2, "pro": 4, "agency": 8}
+    TOKEN_REFRESH_MARGIN: int = 600         # segundos antes do vencimento em que o token é renovado
+    TOKEN_REFRESH_INTERVAL: int = 300       # segundos entre as renovações antecipadas (Beat)
+    TOKEN_REFRESH_BATCH: int = 200          # integrações renovadas por ciclo
 
     # Stripe
     STRIPE_SECRET_KEY: str = ""
@@ -57,7 +104,9 @@ class Settings(BaseSettings):
     EMAIL_FROM: str = "noreply@replyai.com.br"
 
     # Encryption
-    FERNET_KEY: str = ""
+    FERNET_KEY: str = ""                    # chaves separadas por vírgula; a primeira cifra
+    CREDENTIAL_CACHE_TTL: int = 300         # segundos que um token decifrado fica em memória
+    CREDENTIAL_CACHE_SIZE: int = 1024       # tokens decifrados em cache por processo
 
     @property
     def is_production(self) -> bool:
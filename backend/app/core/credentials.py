@@ -0,0 +1,156 @@
+"""Credenciais OAuth do Google por integração.
+
+O access token renovado e sua validade ficam gravados (criptografados) na
+integração, para que todos os processos usem o mesmo token até ele vencer:
+
+- ensure_fresh() renova o token antes de cada uso se ele já venceu ou vence
+  em menos de TOKEN_REFRESH_MARGIN segundos;
+- a tarefa refresh_expiring_tokens (Celery Beat) renova antecipadamente os
+  tokens que vencem antes do próximo ciclo, tirando a renovação do caminho
+  das execuções do agente e dos envios.
+
+Como o token entregue ao cliente ainda vale mais que a margem de renovação
+do google-auth, o cliente não renova por conta própria no meio da execução.
+
+Os tokens decifrados ficam em memória por até CREDENTIAL_CACHE_TTL segundos,
+indexados pela integração e pelo hash do texto cifrado — um token novo (ou
+recifrado) tem outro texto cifrado e nunca aproveita a entrada antiga.
+"""
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.security import decrypt_token, encrypt_token
+from app.models.integration import SocialIntegration
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+_plaintexts: Dict[Tuple[str, str], Tuple[str, float]] = {}  # (integração, hash cifrado) → (token, expira em)
+_plaintexts_lock = threading.Lock()
+
+
+def _decrypt(integration_id: str, encrypted: Optional[str]) -> str:
+    """decrypt_token com cache em memória por (integração, versão do texto cifrado)."""
+    if not encrypted:
+        return ""
+    key = (integration_id, hashlib.sha1(encrypted.encode()).hexdigest())
+    now = time.monotonic()
+    with _plaintexts_lock:
+        cached = _plaintexts.get(key)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    token = decrypt_token(encrypted)
+    with _plaintexts_lock:
+        if len(_plaintexts) >= settings.CREDENTIAL_CACHE_SIZE:
+            for stale in [k for k, (_, expires) in _plaintexts.items() if expires <= now] or list(_plaintexts)[:1]:
+                del _plaintexts[stale]
+        _plaintexts[key] = (token, now + settings.CREDENTIAL_CACHE_TTL)
+    return token
+
+
+def build_credentials(integration: SocialIntegration):
+    """Credentials do google-auth com o token e a validade gravados na integração."""
+    from google.oauth2.credentials import Credentials
+
+    expires_at = integration.token_expires_at
+    if expires_at is not None and expires_at.tzinfo is not None:
+        expires_at = expires_at.astimezone(timezone.utc).replace(tzinfo=None)  # google-auth usa UTC ingênuo
+    return Credentials(
+        token=_decrypt(integration.id, integration.access_token_enc) or None,
+        refresh_token=_decrypt(integration.id, integration.refresh_token_enc) or None,
+        token_uri=TOKEN_URI,
+        client_id=settings.GOOGLE_CLIENT_ID,
+        client_secret=settings.GOOGLE_CLIENT_SECRET,
+        expiry=expires_at,
+    )
+
+
+def expiry_from(credentials) -> Optional[datetime]:
+    """Validade das credenciais (UTC ingênuo no google-auth) como datetime com fuso."""
+    return credentials.expiry.replace(tzinfo=timezone.utc) if credentials.expiry else None
+
+
+def needs_refresh(integration: SocialIntegration, margin: Optional[int] = None) -> bool:
+    if not integration.refresh_token_enc:
+        return False  # sem refresh token não há como renovar
+    if not integration.access_token_enc or integration.token_expires_at is None:
+        return True
+    expires_at = integration.token_expires_at
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    margin = settings.TOKEN_REFRESH_MARGIN if margin is None else margin
+    return expires_at <= datetime.now(timezone.utc) + timedelta(seconds=margin)
+
+
+def refresh(integration: SocialIntegration) -> bool:
+    """Renova o access token e grava o novo token e a validade na integração.
+
+    A gravação usa uma sessão própria (não interfere na transação nem nos
+    locks do chamador); a instância recebida é atualizada como já persistida.
+    Retorna False se a renovação falhar (acesso revogado, rede) — nesse caso
+    o cliente ainda tenta renovar sozinho no primeiro 401, como antes.
+    """
+    from google.auth.exceptions import RefreshError, TransportError
+    from google.auth.transport.requests import Request
+
+    credentials = build_credentials(integration)
+    try:
+        credentials.refresh(Request())
+    except (RefreshError, TransportError):
+        return False
+
+    values = {
+        "access_token_enc": encrypt_token(credentials.token),
+        "token_expires_at": expiry_from(credentials),
+    }
+    if credentials.refresh_token and credentials.refresh_token != _decrypt(integration.id, integration.refresh_token_enc):
+        values["refresh_token_enc"] = encrypt_token(credentials.refresh_token)
+
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(SocialIntegration)
+            .where(SocialIntegration.id == integration.id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    for key, value in values.items():
+        set_committed_value(integration, key, value)
+    return True
+
+
+def ensure_fresh(integration: SocialIntegration) -> SocialIntegration:
+    """Garante que a integração tem um access token válido por mais que a margem."""
+    if needs_refresh(integration):
+        refresh(integration)
+    return integration
+
+
+def refresh_expiring(db: Session, horizon_seconds: int, limit: int) -> int:
+    """Renova os tokens das integrações ativas que vencem dentro do horizonte."""
+    threshold = datetime.now(timezone.utc) + timedelta(seconds=horizon_seconds)
+    integrations = db.query(SocialIntegration).filter(
+        SocialIntegration.is_active == True,
+        SocialIntegration.refresh_token_enc.isnot(None),
+        SocialIntegration.refresh_token_enc != "",
+        (SocialIntegration.token_expires_at.is_(None)) | (SocialIntegration.token_expires_at <= threshold),
+    ).order_by(SocialIntegration.token_expires_at.asc().nulls_first()).limit(limit).all()
+
+    refreshed = 0
+    for integration in integrations:
+        if refresh(integration):
+            refreshed += 1
+    return refreshed
@@ -0,0 +1,130 @@
+"""Lease por integração: impede duas execuções do agente ao mesmo tempo.
+
+Lock no Redis com TTL (AGENT_LEASE_TTL). Quem detém o lease o renova em
+segundo plano enquanto a execução dura; se o worker morrer, o lease expira
+sozinho. O scheduler consulta held_leases para não enfileirar integrações
+que ainda estão rodando.
+
+No pipeline em etapas (ingest → classify → generate → send) o lease passa
+de uma task para a seguinte pelo token (hand_off/resume) e só é liberado
+quando a última etapa termina.
+
+Sem Redis a execução segue sem lease (a unicidade de external_comment_id
+continua protegendo contra duplicatas no banco).
+"""
+import threading
+from typing import Iterable, Optional, Set
+
+import redis
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+KEY_PREFIX = "replyai:lease"
+
+
+def _key(integration_id: str) -> str:
+    return f"{KEY_PREFIX}:{integration_id}"
+
+
+class IntegrationLease:
+    def __init__(self, integration_id: str, ttl: Optional[int] = None):
+        self.integration_id = integration_id
+        self.ttl = ttl or settings.AGENT_LEASE_TTL
+        self._lock = None
+        self._stop = threading.Event()
+        self._renewer: Optional[threading.Thread] = None
+
+    def acquire(self) -> bool:
+        """Tenta obter o lease sem esperar; False se outra execução o detém."""
+        try:
+            lock = get_redis().lock(
+                _key(self.integration_id), timeout=self.ttl, blocking=False, thread_local=False
+            )
+            if not lock.acquire():
+                return False
+        except redis.RedisError:
+            return True  # sem Redis: segue sem lease
+
+        self._lock = lock
+        self._start_renewing()
+        return True
+
+    @classmethod
+    def resume(cls, integration_id: str, token: Optional[str]) -> "IntegrationLease":
+        """Assume o lease recebido da etapa anterior (sem token: segue sem lease)."""
+        run_lease = cls(integration_id)
+        if not token:
+            return run_lease
+        try:
+            lock = get_redis().lock(_key(integration_id), timeout=run_lease.ttl, thread_local=False)
+            lock.local.token = token.encode()
+            lock.extend(run_lease.ttl, replace_ttl=True)
+        except redis.RedisError:
+            return run_lease  # expirou ou Redis fora: a etapa segue sem lease
+
+        run_lease._lock = lock
+        run_lease._start_renewing()
+        return run_lease
+
+    @property
+    def token(self) -> Optional[str]:
+        if not self._lock or self._lock.local.token is None:
+            return None
+        token = self._lock.local.token
+        return token.decode() if isinstance(token, bytes) else token
+
+    def _start_renewing(self):
+        self._stop.clear()
+        self._renewer = threading.Thread(
+            target=self._renew, name=f"lease-{self.integration_id}", daemon=True
+        )
+        self._renewer.start()
+
+    def _renew(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                self._lock.extend(self.ttl, replace_ttl=True)
+            except redis.RedisError:
+                return  # lease perdido ou Redis fora: expira pelo TTL
+
+    def stop(self):
+        """Para a renovação sem liberar o lease (ele expira pelo TTL)."""
+        self._stop.set()
+        if self._renewer:
+            self._renewer.join(timeout=1)
+            self._renewer = None
+
+    def hand_off(self) -> Optional[str]:
+        """Passa o lease para a próxima etapa: renova o TTL e devolve o token."""
+        self.stop()
+        if self._lock:
+            try:
+                self._lock.extend(self.ttl, replace_ttl=True)
+            except redis.RedisError:
+                return None
+        return self.token
+
+    def release(self):
+        self.stop()
+        if self._lock:
+            try:
+                self._lock.release()
+            except redis.RedisError:
+                pass
+            self._lock = None
+
+
+def held_leases(integration_ids: Iterable[str]) -> Set[str]:
+    """Quais das integrações têm um lease ativo agora."""
+    ids = list(integration_ids)
+    if not ids:
+        return set()
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for integration_id in ids:
+            pipe.exists(_key(integration_id))
+        held = pipe.execute()
+    except redis.RedisError:
+        return set()
+    return {integration_id for integration_id, exists in zip(ids, held) if exists}
@@ -0,0 +1,60 @@
+"""Ritmo de envio por canal (token bucket no Redis).
+
+Substitui o time.sleep entre envios: quem enfileira respostas reserva
+horários de envio no bucket do canal e agenda cada envio com countdown. O
+worker fica livre enquanto isso, e envios de execuções diferentes do mesmo
+canal (agente, aprovações manuais) continuam espaçados entre si.
+
+O bucket é um GCRA: no máximo SEND_BURST envios imediatos e depois um a cada
+SEND_MIN_INTERVAL segundos. Sem Redis, o espaçamento vale só dentro do lote.
+"""
+import time
+from typing import List
+
+import redis
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+KEY_PREFIX = "replyai:pacing"
+
+# Reserva n horários de uma vez; devolve os atrasos (segundos) como strings
+# para o Redis não truncar os números do Lua em inteiros.
+_RESERVE = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local n = tonumber(ARGV[4])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+local delays = {}
+for i = 1, n do
+    if tat < now then tat = now end
+    local delay = tat - burst * interval - now
+    if delay < 0 then delay = 0 end
+    delays[i] = tostring(delay)
+    tat = tat + interval
+end
+redis.call('SET', KEYS[1], tostring(tat), 'EX', math.ceil(tat - now) + 60)
+return delays
+"""
+
+
+def channel_key(platform, channel_id: str) -> str:
+    return f"{KEY_PREFIX}:{getattr(platform, 'value', platform)}:{channel_id}"
+
+
+def reserve_send_slots(key: str, count: int = 1) -> List[float]:
+    """Reserva `count` envios no bucket do canal; devolve o countdown de cada um."""
+    if count <= 0:
+        return []
+    interval = max(0.0, settings.SEND_MIN_INTERVAL)
+    burst = max(0, settings.SEND_BURST - 1)
+    try:
+        delays = get_redis().eval(_RESERVE, 1, key, time.time(), interval, burst, count)
+        return [float(delay) for delay in delays]
+    except redis.RedisError:
+        return [max(0, i - burst) * interval for i in range(count)]
+
+
+def reserve_send_slot(key: str) -> float:
+    return reserve_send_slots(key, 1)[0]
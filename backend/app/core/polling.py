@@ -0,0 +1,108 @@
+"""Intervalo de polling adaptativo por integração.
+
+Cada execução do agente escolhe quando a integração deve rodar de novo, a
+partir de três sinais:
+
+- taxa de chegada de comentários (média móvel por hora): canais movimentados
+  são consultados com mais frequência, canais parados com menos;
+- folga de quota: sem envios disponíveis não adianta buscar comentários;
+- janela de atendimento (working_hours/working_days) no fuso do usuário:
+  fora dela a integração vai para o intervalo máximo, e a próxima execução
+  pula direto para a abertura seguinte (next_window_open).
+
+O resultado fica limitado a [POLL_MIN_INTERVAL, POLL_MAX_INTERVAL].
+"""
+from datetime import datetime, time as dt_time, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.core.config import settings
+
+DEFAULT_TIMEZONE = "America/Sao_Paulo"
+MIN_HEADROOM = 0.1  # abaixo disso o intervalo já está no máximo
+
+
+def user_timezone(name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def _parse_hhmm(value: Optional[str], default: dt_time) -> dt_time:
+    try:
+        hours, minutes = (value or "").split(":")
+        return dt_time(int(hours), int(minutes))
+    except ValueError:
+        return default
+
+
+def in_working_window(config, tz_name: Optional[str], now: Optional[datetime] = None) -> bool:
+    """Se `now` cai dentro do horário/dias de atendimento da config, no fuso do usuário.
+
+    working_days usa 0=segunda … 6=domingo. Janelas que viram a meia-noite
+    (ex.: 22:00–06:00) pertencem ao dia em que começam.
+    """
+    local = (now or datetime.now(timezone.utc)).astimezone(user_timezone(tz_name))
+    start = _parse_hhmm(config.working_hours_start, dt_time(0, 0))
+    end = _parse_hhmm(config.working_hours_end, dt_time(23, 59))
+    days = config.working_days if config.working_days is not None else list(range(7))
+    current = local.time().replace(second=0, microsecond=0)
+
+    if start <= end:
+        return local.weekday() in days and start <= current <= end
+    if current >= start:
+        return local.weekday() in days
+    if current <= end:
+        return (local.weekday() - 1) % 7 in days
+    return False
+
+
+def next_window_open(config, tz_name: Optional[str], after: datetime) -> Optional[datetime]:
+    """Próximo instante (UTC) >= `after` em que a janela de atendimento está aberta.
+
+    Retorna `after` se a janela já estiver aberta nele, e None se a config não
+    tem nenhum dia de atendimento.
+    """
+    if in_working_window(config, tz_name, after):
+        return after
+    days = config.working_days if config.working_days is not None else list(range(7))
+    if not days:
+        return None
+
+    tz = user_timezone(tz_name)
+    start = _parse_hhmm(config.working_hours_start, dt_time(0, 0))
+    local_date = after.astimezone(tz).date()
+    for offset in range(8):
+        day = local_date + timedelta(days=offset)
+        if day.weekday() not in days:
+            continue
+        opens = datetime.combine(day, start, tzinfo=tz).astimezone(timezone.utc)
+        if opens >= after:
+            return opens
+    return None
+
+
+def update_arrival_rate(previous: Optional[float], new_comments: int, elapsed_seconds: float) -> float:
+    """Média móvel exponencial da taxa de chegada (comentários/hora)."""
+    previous = previous or 0.0
+    if elapsed_seconds <= 0:
+        return previous
+    observed = new_comments * 3600 / max(elapsed_seconds, settings.POLL_MIN_INTERVAL)
+    alpha = min(1.0, max(0.0, settings.POLL_RATE_SMOOTHING))
+    return alpha * observed + (1 - alpha) * previous
+
+
+def next_poll_interval(rate_per_hour: float, quota_headroom: float, window_open: bool) -> int:
+    """Segundos até a próxima execução.
+
+    O intervalo base é o tempo para chegarem ~POLL_TARGET_COMMENTS comentários;
+    com pouca folga de quota ele é esticado na mesma proporção.
+    """
+    low, high = settings.POLL_MIN_INTERVAL, max(settings.POLL_MIN_INTERVAL, settings.POLL_MAX_INTERVAL)
+    if not window_open or rate_per_hour <= 0 or quota_headroom < MIN_HEADROOM:
+        return high
+
+    interval = 3600 * settings.POLL_TARGET_COMMENTS / rate_per_hour
+    interval /= min(1.0, quota_headroom)
+    return int(min(high, max(low, interval)))
@@ -0,0 +1,265 @@
+"""Quotas de envio por integração em Redis (janela deslizante).
+
+- Hora: ZSET com os timestamps de envio das últimas 25h (janela deslizante
+  de 1h via ZCOUNT; o maior score é o último envio).
+- Dia (UTC): contador INCR por data, usado no limite diário do plano.
+
+- Fila de envio: SET com as respostas queued (já contam como enviadas na
+  quota do Piloto Automático) e ZSET com as que a quota da YouTube Data API
+  estacionou até o reset.
+
+Os contadores são incrementados quando um envio dá certo (record_send) e
+reconciliados com o Postgres periodicamente (reconcile). Se o marcador de
+sincronização de uma integração sumir (Redis reiniciado/limpo), a primeira
+leitura reconstrói os contadores a partir do banco. Sem Redis, a leitura cai
+para as consultas no Postgres.
+"""
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, NamedTuple, Optional
+
+import redis
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.models.comment import Comment, Response as CommentResponse, ResponseStatus
+
+KEY_PREFIX = "replyai:quota"
+WINDOW_SECONDS = 25 * 3600  # guarda um pouco mais que 24h de envios no ZSET
+
+# ZADD + poda da janela + contador do dia, de forma atômica
+_RECORD_SEND = """
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1] - ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+local day = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], 2 * 86400)
+return day
+"""
+
+
+class QuotaUsage(NamedTuple):
+    sent_today: int
+    sent_this_hour: int
+    last_sent_at: Optional[datetime]
+
+
+def _sends_key(integration_id: str) -> str:
+    return f"{KEY_PREFIX}:{integration_id}:sends"
+
+
+def _day_key(integration_id: str, day: str) -> str:
+    return f"{KEY_PREFIX}:{integration_id}:day:{day}"
+
+
+def _synced_key(integration_id: str) -> str:
+    return f"{KEY_PREFIX}:{integration_id}:synced"
+
+
+def _queued_key(integration_id: str) -> str:
+    return f"{KEY_PREFIX}:{integration_id}:queued"
+
+
+def _parked_key(integration_id: str) -> str:
+    return f"{KEY_PREFIX}:{integration_id}:parked"
+
+
+def _utc_day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).date().isoformat()
+
+
+def get_usage(db: Session, integration_id: str) -> QuotaUsage:
+    """Uso atual da integração — O(1) no Redis, sem tocar a tabela responses."""
+    r = get_redis()
+    now = time.time()
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.exists(_synced_key(integration_id))
+        pipe.get(_day_key(integration_id, _utc_day(now)))
+        pipe.zcount(_sends_key(integration_id), now - 3600, "+inf")
+        pipe.zrevrange(_sends_key(integration_id), 0, 0, withscores=True)
+        synced, day_count, hour_count, last = pipe.execute()
+    except redis.RedisError:
+        return _usage_from_db(db, integration_id)
+
+    if not synced:
+        return reconcile(db, integration_id)
+
+    last_sent_at = datetime.fromtimestamp(last[0][1], tz=timezone.utc) if last else None
+    return QuotaUsage(int(day_count or 0), int(hour_count or 0), last_sent_at)
+
+
+def record_send(integration_id: str, sent_at: Optional[datetime] = None, member: Optional[str] = None):
+    """Registra um envio bem-sucedido nos contadores da integração."""
+    ts = (sent_at or datetime.now(timezone.utc)).timestamp()
+    try:
+        get_redis().eval(
+            _RECORD_SEND,
+            2,
+            _sends_key(integration_id),
+            _day_key(integration_id, _utc_day(ts)),
+            ts,
+            member or str(uuid.uuid4()),
+            WINDOW_SECONDS,
+        )
+    except redis.RedisError:
+        pass  # a próxima reconciliação corrige a partir do Postgres
+
+
+def track_queued(integration_id: str, response_ids: Iterable[str]):
+    """Coloca respostas na fila de envio da integração."""
+    ids = list(response_ids)
+    if not ids:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.sadd(_queued_key(integration_id), *ids)
+        pipe.expire(_queued_key(integration_id), WINDOW_SECONDS)
+        pipe.execute()
+    except redis.RedisError:
+        pass  # a próxima reconciliação corrige a partir do Postgres
+
+
+def settle_queued(integration_id: str, response_ids: Iterable[str]):
+    """Tira da fila de envio as respostas que saíram do status queued."""
+    ids = list(response_ids)
+    if not ids:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.srem(_queued_key(integration_id), *ids)
+        pipe.zrem(_parked_key(integration_id), *ids)
+        pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+def queued_count(db: Session, integration_id: str) -> int:
+    """Respostas na fila de envio — O(1) no Redis, sem tocar a tabela responses."""
+    try:
+        return int(get_redis().scard(_queued_key(integration_id)))
+    except redis.RedisError:
+        return db.query(func.count(CommentResponse.id)).join(Comment).filter(
+            Comment.integration_id == integration_id,
+            CommentResponse.status == ResponseStatus.queued,
+        ).scalar() or 0
+
+
+def park(integration_id: str, response_ids: Iterable[str]):
+    """Estaciona respostas queued até o reset da quota da YouTube Data API."""
+    now = time.time()
+    parked = {response_id: now for response_id in response_ids}
+    if not parked:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zadd(_parked_key(integration_id), parked, nx=True)
+        pipe.expire(_parked_key(integration_id), WINDOW_SECONDS)
+        pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+def pop_parked(db: Session, integration_id: str) -> List[str]:
+    """Retira as respostas estacionadas (mais antigas primeiro) para voltarem à etapa send."""
+    try:
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.zrange(_parked_key(integration_id), 0, -1)
+        pipe.delete(_parked_key(integration_id))
+        return list(pipe.execute()[0])
+    except redis.RedisError:
+        return [row[0] for row in _parked_from_db(db, integration_id)]
+
+
+def reconcile(db: Session, integration_id: str) -> QuotaUsage:
+    """Reconstrói os contadores da integração a partir do Postgres."""
+    now = datetime.now(timezone.utc)
+    rows = recent_sends_query(db, integration_id, now).all()
+    sends = {response_id: _as_utc(sent_at).timestamp() for response_id, sent_at in rows if sent_at}
+
+    today = now.date().isoformat()
+    sent_today = sum(1 for ts in sends.values() if _utc_day(ts) == today)
+    hour_ago = (now - timedelta(hours=1)).timestamp()
+    sent_this_hour = sum(1 for ts in sends.values() if ts >= hour_ago)
+    last_sent_at = datetime.fromtimestamp(max(sends.values()), tz=timezone.utc) if sends else None
+    if last_sent_at is None:
+        last_sent_at = _last_sent_from_db(db, integration_id)
+
+    queued = [row[0] for row in db.query(CommentResponse.id).join(Comment).filter(
+        Comment.integration_id == integration_id,
+        CommentResponse.status == ResponseStatus.queued,
+    ).all()]
+    parked = {
+        response_id: _as_utc(created_at).timestamp() if created_at else now.timestamp()
+        for response_id, created_at in _parked_from_db(db, integration_id)
+    }
+
+    try:
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.delete(_sends_key(integration_id))
+        if sends:
+            pipe.zadd(_sends_key(integration_id), sends)
+        elif last_sent_at:
+            # Mantém o último envio (mais antigo que a janela) para o response_delay_minutes
+            pipe.zadd(_sends_key(integration_id), {"last": last_sent_at.timestamp()})
+        pipe.expire(_sends_key(integration_id), WINDOW_SECONDS)
+        pipe.set(_day_key(integration_id, today), sent_today, ex=2 * 86400)
+        pipe.delete(_queued_key(integration_id), _parked_key(integration_id))
+        if queued:
+            pipe.sadd(_queued_key(integration_id), *queued)
+            pipe.expire(_queued_key(integration_id), WINDOW_SECONDS)
+        if parked:
+            pipe.zadd(_parked_key(integration_id), parked)
+            pipe.expire(_parked_key(integration_id), WINDOW_SECONDS)
+        pipe.set(_synced_key(integration_id), now.isoformat(), ex=settings.QUOTA_RECONCILE_TTL)
+        pipe.execute()
+    except redis.RedisError:
+        pass
+
+    return QuotaUsage(sent_today, sent_this_hour, last_sent_at)
+
+
+def recent_sends_query(db: Session, integration_id: str, now: datetime):
+    """(id, sent_at) das respostas enviadas pela integração dentro de WINDOW_SECONDS."""
+    return db.query(CommentResponse.id, CommentResponse.sent_at).join(Comment).filter(
+        Comment.integration_id == integration_id,
+        CommentResponse.status == ResponseStatus.sent,
+        CommentResponse.sent_at >= now - timedelta(seconds=WINDOW_SECONDS),
+    )
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _last_sent_from_db(db: Session, integration_id: str) -> Optional[datetime]:
+    last = db.query(func.max(CommentResponse.sent_at)).join(Comment).filter(
+        Comment.integration_id == integration_id,
+        CommentResponse.status == ResponseStatus.sent,
+    ).scalar()
+    return _as_utc(last) if last else None
+
+
+def _parked_from_db(db: Session, integration_id: str) -> list:
+    """(id, created_at) das respostas queued estacionadas pela quota (com error_message)."""
+    return db.query(CommentResponse.id, CommentResponse.created_at).join(Comment).filter(
+        Comment.integration_id == integration_id,
+        CommentResponse.status == ResponseStatus.queued,
+        CommentResponse.error_message.isnot(None),
+    ).order_by(CommentResponse.created_at).all()
+
+
+def _usage_from_db(db: Session, integration_id: str) -> QuotaUsage:
+    """Fallback sem Redis: as mesmas contagens direto no Postgres."""
+    now = datetime.now(timezone.utc)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    base = db.query(func.count(CommentResponse.id)).join(Comment).filter(
+        Comment.integration_id == integration_id,
+        CommentResponse.status == ResponseStatus.sent,
+    )
+    sent_today = base.filter(CommentResponse.sent_at >= today_start).scalar() or 0
+    sent_this_hour = base.filter(CommentResponse.sent_at >= now - timedelta(hours=1)).scalar() or 0
+    return QuotaUsage(sent_today, sent_this_hour, _last_sent_from_db(db, integration_id))
@@ -0,0 +1,14 @@
+import redis
+from functools import lru_cache
+from app.core.config import settings
+
+
+@lru_cache()
+def get_redis() -> redis.Redis:
+    """Cliente Redis compartilhado do processo (o pool do redis-py é seguro após fork)."""
+    return redis.Redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        socket_timeout=2,
+        socket_connect_timeout=2,
+    )
@@ -0,0 +1,66 @@
+"""Busca de comentários por texto (do comentário e da resposta gerada).
+
+Combina full-text em português (to_tsvector/websearch_to_tsquery, com
+stemming: "vídeos" encontra "vídeo") com trigramas do pg_trgm para
+substrings e pedaços de palavra. As duas formas são servidas pelos índices
+GIN declarados em app/models/comment.py — as expressões aqui precisam ser
+as mesmas dos índices para o planner usá-los.
+"""
+from typing import List
+
+from sqlalchemy import Float, cast, func, or_, select, union
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.comment import Comment, Response as CommentResponse
+
+SEARCH_CONFIG = "portuguese"
+REPLY_WEIGHT = 0.5  # peso de um acerto só na resposta, em relação ao comentário
+
+
+def _tsvector(column) -> ColumnElement:
+    return func.to_tsvector(SEARCH_CONFIG, column)
+
+
+def _tsquery(term: str) -> ColumnElement:
+    return func.websearch_to_tsquery(SEARCH_CONFIG, term)
+
+
+def _matches(column, term: str) -> ColumnElement:
+    # ILIKE '%termo%' usa o índice de trigramas (termos com 3+ caracteres)
+    return or_(_tsvector(column).op("@@")(_tsquery(term)), column.ilike(f"%{term}%"))
+
+
+def _relevance(column, term: str) -> ColumnElement:
+    return func.greatest(
+        func.ts_rank_cd(_tsvector(column), _tsquery(term)),
+        func.word_similarity(term, column),
+    )
+
+
+def search_condition(term: str, integration_ids: List[str]) -> ColumnElement:
+    """Comentários das integrações cujo texto ou resposta casam com o termo."""
+    in_comments = select(Comment.id).where(
+        Comment.integration_id.in_(integration_ids),
+        _matches(Comment.text, term),
+    )
+    in_replies = select(CommentResponse.comment_id).join(Comment).where(
+        Comment.integration_id.in_(integration_ids),
+        _matches(CommentResponse.text, term),
+    )
+    return Comment.id.in_(union(in_comments, in_replies))
+
+
+def search_rank(term: str) -> ColumnElement:
+    """Relevância do comentário para o termo (maior = mais relevante)."""
+    # Correlaciona só com comments: a consulta externa pode ter um JOIN com
+    # responses (filtro de status), e a subconsulta precisa do próprio FROM responses
+    reply_rank = select(_relevance(CommentResponse.text, term)).where(
+        CommentResponse.comment_id == Comment.id
+    ).correlate(Comment).scalar_subquery()
+    return cast(
+        func.greatest(
+            _relevance(Comment.text, term),
+            func.coalesce(reply_rank, 0) * REPLY_WEIGHT,
+        ),
+        Float,
+    )
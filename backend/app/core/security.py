@@ -1,8 +1,9 @@
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 from app.core.config import settings
 
 # ──────────────────────────────────────────────
@@ -49,10 +50,18 @@ def decode_token(token: str) -> Optional[dict]:
 # ──────────────────────────────────────────────
 # Fernet (encrypt/decrypt OAuth tokens no banco)
 # ──────────────────────────────────────────────
-def _get_fernet() -> Optional[Fernet]:
-    if not settings.FERNET_KEY:
-        return None
-    return Fernet(settings.FERNET_KEY.encode())
+# FERNET_KEY aceita várias chaves separadas por vírgula: a primeira cifra,
+# todas decifram. Para trocar a chave, coloque a nova na frente, rode
+# scripts/rotate_fernet_key.py e depois remova a antiga.
+def _get_fernet() -> Optional[MultiFernet]:
+    return _build_fernet(settings.FERNET_KEY)
+
+
+@lru_cache(maxsize=4)
+def _build_fernet(keys: str) -> Optional[MultiFernet]:
+    """Cifra montada uma vez por processo (por valor de FERNET_KEY)."""
+    fernets = [Fernet(key.strip().encode()) for key in keys.split(",") if key.strip()]
+    return MultiFernet(fernets) if fernets else None
 
 
 def encrypt_token(token: str) -> str:
@@ -67,3 +76,11 @@ def decrypt_token(encrypted: str) -> str:
     if not f:
         return encrypted
     return f.decrypt(encrypted.encode()).decode()
+
+
+def rotate_token(encrypted: str) -> str:
+    """Recifra o token com a chave principal (a primeira de FERNET_KEY)."""
+    f = _get_fernet()
+    if not f or not encrypted:
+        return encrypted
+    return f.rotate(encrypted.encode()).decode()
@@ -0,0 +1,89 @@
+"""Rollups diários (DailyStat) mantidos incrementalmente.
+
+O agente e o envio manual somam eventos à linha (integração, dia UTC) no
+momento em que acontecem, e o dashboard lê só essas linhas — o custo não
+cresce com o histórico de comentários.
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.comment import DailyStat
+
+
+def today_str() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def record_daily_stats(
+    db: Session,
+    integration_id: str,
+    received: int = 0,
+    sent: int = 0,
+    failed: int = 0,
+    skipped: int = 0,
+    tokens: int = 0,
+    response_time_s: float = 0.0,
+    day: Optional[str] = None,
+):
+    """Soma eventos ao DailyStat do dia (upsert atômico no banco).
+
+    response_time_s é a soma dos tempos de resposta dos `sent` envios; a média
+    é recalculada no próprio UPDATE. Não faz commit — segue a transação do chamador.
+    """
+    if not any((received, sent, failed, skipped, tokens)):
+        return
+    day = day or today_str()
+
+    values = {
+        DailyStat.comments_received: DailyStat.comments_received + received,
+        DailyStat.responses_sent: DailyStat.responses_sent + sent,
+        DailyStat.responses_failed: DailyStat.responses_failed + failed,
+        DailyStat.responses_skipped: DailyStat.responses_skipped + skipped,
+        DailyStat.tokens_consumed: DailyStat.tokens_consumed + tokens,
+        DailyStat.updated_at: datetime.now(timezone.utc),
+    }
+    if sent:
+        values[DailyStat.avg_response_time_s] = (
+            (DailyStat.avg_response_time_s * DailyStat.responses_sent + response_time_s)
+            / (DailyStat.responses_sent + sent)
+        )
+
+    for _ in range(2):
+        updated = db.query(DailyStat).filter(
+            DailyStat.integration_id == integration_id,
+            DailyStat.date == day,
+        ).update(values, synchronize_session=False)
+        if updated:
+            return
+
+        try:
+            with db.begin_nested():
+                db.add(DailyStat(
+                    id=str(uuid.uuid4()),
+                    integration_id=integration_id,
+                    date=day,
+                    comments_received=received,
+                    responses_sent=sent,
+                    responses_failed=failed,
+                    responses_skipped=skipped,
+                    tokens_consumed=tokens,
+                    avg_response_time_s=(response_time_s / sent) if sent else 0.0,
+                ))
+            return
+        except IntegrityError:
+            continue  # outra execução criou a linha do dia: tenta o UPDATE de novo
+
+
+def response_time_seconds(received_at: Optional[datetime], sent_at: Optional[datetime]) -> float:
+    """Tempo entre o comentário chegar (publishedAt) e a resposta ser enviada."""
+    if not received_at or not sent_at:
+        return 0.0
+    if received_at.tzinfo is None:
+        received_at = received_at.replace(tzinfo=timezone.utc)
+    if sent_at.tzinfo is None:
+        sent_at = sent_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (sent_at - received_at).total_seconds())
@@ -0,0 +1,124 @@
+"""Clientes da YouTube Data API por processo.
+
+Montar um cliente com `build("youtube", "v3")` relê e faz o parse do
+documento de discovery (centenas de KB de JSON) a cada chamada, e cada
+cliente novo abre sua própria conexão HTTP. Aqui:
+
+- o documento de discovery é carregado e parseado uma vez por processo;
+- o cliente autorizado de cada integração é reaproveitado por até
+  YOUTUBE_CLIENT_TTL segundos (mantém a conexão keep-alive e o access token
+  renovado em memória). O token vem do gerenciador de credenciais
+  (app/core/credentials.py); quando ele é renovado, o cliente é recriado;
+- prewarm() adianta esse trabalho na inicialização do processo do worker.
+
+Os caches são recriados se o processo mudou (fork do worker prefork do
+Celery). Um cliente (httplib2) não é thread-safe: ele deve ser usado por uma
+tarefa de cada vez, como no pool prefork.
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core import credentials
+from app.core.config import settings
+
+_discovery: Optional[dict] = None
+_clients: Dict[str, Tuple[object, tuple, float]] = {}  # integração → (cliente, tokens, expira em)
+_cache_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def _reset_if_forked():
+    global _discovery, _cache_pid
+    pid = os.getpid()
+    if _cache_pid != pid:
+        _discovery = None
+        _clients.clear()
+        _cache_pid = pid
+
+
+def discovery_document() -> dict:
+    """Documento de discovery do youtube v3, parseado uma vez por processo."""
+    global _discovery
+    with _lock:
+        _reset_if_forked()
+        if _discovery is None:
+            from googleapiclient.discovery_cache import get_static_doc
+
+            _discovery = json.loads(get_static_doc("youtube", "v3"))
+        return _discovery
+
+
+def build_youtube(credentials):
+    """Cliente novo para as credenciais dadas, a partir do discovery em cache."""
+    from googleapiclient.discovery import build_from_document
+
+    return build_from_document(discovery_document(), credentials=credentials)
+
+
+def get_youtube(integration):
+    """Cliente autorizado da integração, com o access token renovado se preciso."""
+    credentials.ensure_fresh(integration)
+    return _cached_client(integration)
+
+
+def _cached_client(integration):
+    """Reaproveita o cliente do processo enquanto os tokens gravados não mudarem."""
+    fingerprint = (integration.access_token_enc, integration.refresh_token_enc)
+    now = time.monotonic()
+    with _lock:
+        _reset_if_forked()
+        cached = _clients.get(integration.id)
+    if cached and cached[1] == fingerprint and cached[2] > now:
+        return cached[0]
+
+    client = build_youtube(credentials.build_credentials(integration))
+    with _lock:
+        if len(_clients) >= settings.YOUTUBE_CLIENT_CACHE_SIZE:
+            _evict(now)
+        _clients[integration.id] = (client, fingerprint, now + settings.YOUTUBE_CLIENT_TTL)
+    return client
+
+
+def _evict(now: float):
+    """Remove os expirados; se ainda estiver cheio, os que expiram primeiro."""
+    for key in [key for key, (_, _, expires) in _clients.items() if expires <= now]:
+        del _clients[key]
+    overflow = len(_clients) - settings.YOUTUBE_CLIENT_CACHE_SIZE + 1
+    if overflow > 0:
+        for key in sorted(_clients, key=lambda k: _clients[k][2])[:overflow]:
+            del _clients[key]
+
+
+def prewarm():
+    """Carrega o discovery e monta os clientes das próximas integrações a rodar.
+
+    Chamado na inicialização de cada processo do worker; falhas aqui só
+    adiam o trabalho para a primeira tarefa.
+    """
+    try:
+        discovery_document()
+    except Exception:
+        return
+    if settings.YOUTUBE_PREWARM_CLIENTS <= 0:
+        return
+
+    from app.core.database import SessionLocal
+    from app.models.integration import Platform, SocialIntegration
+
+    db = SessionLocal()
+    try:
+        integrations = db.query(SocialIntegration).filter(
+            SocialIntegration.is_active == True,
+            SocialIntegration.platform == Platform.youtube,
+        ).order_by(SocialIntegration.next_run_at.asc().nullsfirst()).limit(
+            settings.YOUTUBE_PREWARM_CLIENTS
+        ).all()
+        for integration in integrations:
+            _cached_client(integration)  # sem renovar tokens: isso fica com a tarefa de refresh
+    except Exception:
+        pass
+    finally:
+        db.close()
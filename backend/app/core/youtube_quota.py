@@ -0,0 +1,237 @@
+"""Quota da YouTube Data API (unidades por dia, em Redis).
+
+Todas as integrações dividem a quota diária de um único projeto do Google,
+que zera à meia-noite no horário do Pacífico. Este módulo:
+
+- contabiliza as unidades de cada chamada (commentThreads.list = 1,
+  comments.insert = 50) por integração e no total do projeto;
+- reparte a quota entre as integrações ativas pelo peso do plano
+  (YOUTUBE_QUOTA_PLAN_WEIGHTS): a fatia de cada integração é
+  quota × peso / soma dos pesos;
+- marca o projeto como esgotado quando o Google responde quotaExceeded, para
+  que as integrações fiquem estacionadas até o reset em vez de tentar de novo
+  a cada minuto.
+
+A reserva é feita antes da chamada (o Google cobra a unidade mesmo se a
+chamada falhar). Sem Redis, nada é bloqueado — vale a resposta do Google.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+import redis
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+KEY_PREFIX = "replyai:ytquota"
+PACIFIC = ZoneInfo("America/Los_Angeles")
+WEIGHTS_TTL = 300  # segundos de cache da soma dos pesos
+
+UNIT_COSTS = {
+    "channels.list": 1,
+    "commentThreads.list": 1,
+    "comments.insert": 50,
+}
+QUOTA_REASONS = (b"quotaExceeded", b"dailyLimitExceeded")
+
+# Motivos de recusa de reserve()
+EXHAUSTED = "exhausted"   # o Google já respondeu quotaExceeded hoje
+PROJECT = "project"       # a quota total do projeto acabaria
+BUDGET = "budget"         # a fatia da integração acabaria
+
+# Confere projeto esgotado, total do projeto e fatia da integração; reserva as unidades
+_RESERVE = """
+if redis.call('EXISTS', KEYS[3]) == 1 then return 1 end
+local units = tonumber(ARGV[1])
+local total = tonumber(redis.call('GET', KEYS[1]) or '0')
+if total + units > tonumber(ARGV[2]) then return 2 end
+local used = tonumber(redis.call('GET', KEYS[2]) or '0')
+if used + units > tonumber(ARGV[3]) then return 3 end
+redis.call('INCRBY', KEYS[1], units)
+redis.call('INCRBY', KEYS[2], units)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return 0
+"""
+_DENIALS = {1: EXHAUSTED, 2: PROJECT, 3: BUDGET}
+
+
+class QuotaDenied(Exception):
+    """A chamada não cabe na quota do dia (motivo em `reason`)."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class ApiUsage(NamedTuple):
+    used: int           # unidades da integração hoje
+    budget: int         # fatia da integração
+    project_used: int   # unidades do projeto hoje
+
+    @property
+    def units_left(self) -> int:
+        return max(0, min(self.budget - self.used, settings.YOUTUBE_DAILY_QUOTA - self.project_used))
+
+    @property
+    def sends_left(self) -> int:
+        return self.units_left // UNIT_COSTS["comments.insert"]
+
+    @property
+    def headroom(self) -> float:
+        """Fração da fatia ainda disponível (0 a 1)."""
+        if self.budget <= 0:
+            return 0.0
+        return min(1.0, self.units_left / self.budget)
+
+
+def quota_day(now: Optional[datetime] = None) -> str:
+    """Dia da quota (data no horário do Pacífico)."""
+    return (now or datetime.now(timezone.utc)).astimezone(PACIFIC).date().isoformat()
+
+
+def next_reset(now: Optional[datetime] = None) -> datetime:
+    """Próxima meia-noite do Pacífico, em UTC."""
+    local = (now or datetime.now(timezone.utc)).astimezone(PACIFIC)
+    midnight = datetime.combine(local.date() + timedelta(days=1), datetime.min.time(), tzinfo=PACIFIC)
+    return midnight.astimezone(timezone.utc)
+
+
+def _project_key(day: str) -> str:
+    return f"{KEY_PREFIX}:{day}:project"
+
+
+def _integration_key(day: str, integration_id: str) -> str:
+    return f"{KEY_PREFIX}:{day}:{integration_id}"
+
+
+def _exhausted_key(day: str) -> str:
+    return f"{KEY_PREFIX}:{day}:exhausted"
+
+
+def _ttl(now: datetime) -> int:
+    return int((next_reset(now) - now).total_seconds()) + 3600
+
+
+def budget_for(db: Session, integration) -> int:
+    """Fatia diária da integração: quota do projeto × peso do plano / soma dos pesos."""
+    plan = integration.user.plan if integration.user else None
+    weight = _plan_weight(getattr(plan, "slug", None))
+    total = max(weight, _total_weight(db))
+    return int(settings.YOUTUBE_DAILY_QUOTA * weight / total)
+
+
+def _plan_weight(slug) -> float:
+    return float(settings.YOUTUBE_QUOTA_PLAN_WEIGHTS.get(getattr(slug, "value", slug), 1))
+
+
+def _total_weight(db: Session) -> float:
+    """Soma dos pesos das integrações ativas do YouTube (cacheada por WEIGHTS_TTL)."""
+    key = f"{KEY_PREFIX}:weights"
+    try:
+        cached = get_redis().get(key)
+        if cached is not None:
+            return float(cached)
+    except redis.RedisError:
+        pass
+
+    from app.models.integration import Platform, SocialIntegration
+    from app.models.user import Plan, User
+
+    rows = db.query(Plan.slug, func.count(SocialIntegration.id)).select_from(SocialIntegration).join(
+        User, User.id == SocialIntegration.user_id
+    ).outerjoin(
+        Plan, Plan.id == User.plan_id
+    ).filter(
+        SocialIntegration.is_active == True,
+        SocialIntegration.platform == Platform.youtube,
+    ).group_by(Plan.slug).all()
+    total = sum(_plan_weight(slug) * count for slug, count in rows)
+
+    try:
+        get_redis().set(key, total, ex=WEIGHTS_TTL)
+    except redis.RedisError:
+        pass
+    return total
+
+
+def reserve(integration_id: str, method: str, budget: int, now: Optional[datetime] = None) -> Optional[str]:
+    """Reserva as unidades de uma chamada; None se pode chamar, senão o motivo da recusa."""
+    now = now or datetime.now(timezone.utc)
+    day = quota_day(now)
+    try:
+        code = get_redis().eval(
+            _RESERVE,
+            3,
+            _project_key(day),
+            _integration_key(day, integration_id),
+            _exhausted_key(day),
+            UNIT_COSTS[method],
+            settings.YOUTUBE_DAILY_QUOTA,
+            budget,
+            _ttl(now),
+        )
+    except redis.RedisError:
+        return None
+    return _DENIALS.get(int(code))
+
+
+def record(method: str, integration_id: Optional[str] = None, now: Optional[datetime] = None):
+    """Contabiliza uma chamada feita sem reserva (ex.: callback do OAuth)."""
+    now = now or datetime.now(timezone.utc)
+    day = quota_day(now)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        keys = [_project_key(day)] + ([_integration_key(day, integration_id)] if integration_id else [])
+        for key in keys:
+            pipe.incrby(key, UNIT_COSTS[method])
+            pipe.expire(key, _ttl(now))
+        pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+def usage(integration_id: str, budget: int, now: Optional[datetime] = None) -> ApiUsage:
+    day = quota_day(now)
+    try:
+        used, project_used = get_redis().mget(_integration_key(day, integration_id), _project_key(day))
+    except redis.RedisError:
+        used, project_used = 0, 0
+    return ApiUsage(int(used or 0), budget, int(project_used or 0))
+
+
+def is_quota_error(exc: Exception) -> bool:
+    """Se a exceção é o 403 de quota diária esgotada da YouTube Data API."""
+    from googleapiclient.errors import HttpError
+
+    if not isinstance(exc, HttpError) or exc.resp.status != 403:
+        return False
+    content = exc.content if isinstance(exc.content, bytes) else str(exc.content or "").encode()
+    return any(reason in content for reason in QUOTA_REASONS)
+
+
+def mark_exhausted(now: Optional[datetime] = None):
+    """Marca a quota do projeto como esgotada até o próximo reset."""
+    now = now or datetime.now(timezone.utc)
+    try:
+        get_redis().set(_exhausted_key(quota_day(now)), 1, ex=_ttl(now))
+    except redis.RedisError:
+        pass
+
+
+def exhausted_until(now: Optional[datetime] = None) -> Optional[datetime]:
+    """Horário do reset se a quota do projeto está esgotada; None se ainda há quota."""
+    now = now or datetime.now(timezone.utc)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.exists(_exhausted_key(quota_day(now)))
+        pipe.get(_project_key(quota_day(now)))
+        exhausted, project_used = pipe.execute()
+    except redis.RedisError:
+        return None
+    if exhausted or int(project_used or 0) >= settings.YOUTUBE_DAILY_QUOTA:
+        return next_reset(now)
+    return None
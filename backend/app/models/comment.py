@@ -2,7 +2,7 @@ import enum
 from datetime import datetime, timezone
 from sqlalchemy import (
     Column, String, Boolean, DateTime, Integer, Text, Float,
-    ForeignKey, Enum as SAEnum
+    ForeignKey, Index, UniqueConstraint, Enum as SAEnum, DDL, event, text as sa_text
 )
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -21,6 +21,7 @@ class CommentCategory(str, enum.Enum):
 
 class ResponseStatus(str, enum.Enum):
     pending = "pending"      # aguardando aprovação manual
+    queued = "queued"        # Piloto Automático: aguardando a etapa de envio
     sent = "sent"            # enviado com sucesso
     failed = "failed"        # erro ao enviar
     skipped = "skipped"      # pulado (spam/ofensa)
@@ -29,6 +30,17 @@ class ResponseStatus(str, enum.Enum):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_integration_created", "integration_id", "created_at"),
+        Index("ix_comments_integration_category_created", "integration_id", "category", "created_at"),
+        # Busca (app/core/search.py): full-text em português + trigramas para substring
+        Index(
+            "ix_comments_text_fts", sa_text("to_tsvector('portuguese', text)"), postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_comments_text_trgm", "text", postgresql_using="gin", postgresql_ops={"text": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(String(36), primary_key=True)
     integration_id = Column(String(36), ForeignKey("social_integrations.id"), nullable=False)
@@ -39,6 +51,7 @@ class Comment(Base):
     category = Column(SAEnum(CommentCategory), nullable=True)
     platform_url = Column(String(800), nullable=True)
     video_id = Column(String(200), nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 do texto (cache de classificação)
     received_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
@@ -48,6 +61,15 @@ class Comment(Base):
 
 class Response(Base):
     __tablename__ = "responses"
+    __table_args__ = (
+        Index("ix_responses_status_sent_at", "status", "sent_at"),
+        Index(
+            "ix_responses_text_fts", sa_text("to_tsvector('portuguese', text)"), postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_responses_text_trgm", "text", postgresql_using="gin", postgresql_ops={"text": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(String(36), primary_key=True)
     comment_id = Column(String(36), ForeignKey("comments.id"), unique=True, nullable=False)
@@ -65,6 +87,9 @@ class Response(Base):
 
 class DailyStat(Base):
     __tablename__ = "daily_stats"
+    __table_args__ = (
+        UniqueConstraint("integration_id", "date", name="uq_daily_stats_integration_date"),
+    )
 
     id = Column(String(36), primary_key=True)
     integration_id = Column(String(36), ForeignKey("social_integrations.id"), nullable=False)
@@ -79,3 +104,11 @@ class DailyStat(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=lambda: datetime.now(timezone.utc))
 
     integration = relationship("SocialIntegration", back_populates="daily_stats")
+
+
+# Os índices de trigramas dependem da extensão pg_trgm
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -1,8 +1,8 @@
 import enum
 from datetime import datetime, timezone
 from sqlalchemy import (
-    Column, String, Boolean, DateTime, Integer, Text, JSON,
-    ForeignKey, Enum as SAEnum
+    Column, String, Boolean, DateTime, Integer, Float, Text, JSON,
+    ForeignKey, Index, Enum as SAEnum, text
 )
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -26,6 +26,11 @@ class AgentTone(str, enum.Enum):
 
 class SocialIntegration(Base):
     __tablename__ = "social_integrations"
+    __table_args__ = (
+        Index("ix_social_integrations_user_active", "user_id", "is_active"),
+        Index("ix_social_integrations_active", "id", postgresql_where=text("is_active")),
+        Index("ix_social_integrations_due", "next_run_at", postgresql_where=text("is_active")),
+    )
 
     id = Column(String(36), primary_key=True)
     user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
@@ -38,6 +43,12 @@ class SocialIntegration(Base):
     token_expires_at = Column(DateTime(timezone=True), nullable=True)
     is_active = Column(Boolean, default=True)
     last_run_at = Column(DateTime(timezone=True), nullable=True)
+    last_comment_published_at = Column(DateTime(timezone=True), nullable=True)  # watermark da ingestão
+    resume_page_token = Column(String(255), nullable=True)      # onde retomar uma ingestão interrompida
+    resume_published_at = Column(DateTime(timezone=True), nullable=True)  # mais novo já visto na ingestão interrompida
+    comment_rate_per_hour = Column(Float, default=0.0)        # taxa de chegada (média móvel)
+    poll_interval_seconds = Column(Integer, nullable=True)    # intervalo escolhido (app/core/polling.py)
+    next_run_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime(timezone=True), onupdate=lambda: datetime.now(timezone.utc))
 
@@ -103,6 +103,8 @@ class IntegrationOut(BaseModel):
     channel_avatar: Optional[str] = None
     is_active: bool
     last_run_at: Optional[datetime] = None
+    poll_interval_seconds: Optional[int] = None
+    next_run_at: Optional[datetime] = None
     created_at: datetime
 
     model_config = {"from_attributes": True}
@@ -188,6 +190,16 @@ class ResponseOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class CommentPage(BaseModel):
+    items: List[CommentOut]
+    next_cursor: Optional[str] = None  # None = última página
+    total: Optional[int] = None  # só com include_total=true (contagem em cache)
+
+
+class ApproveRequest(BaseModel):
+    comment_ids: List[str]
+
+
 # ─── Analytics ────────────────────────────────────────────────────────────────
 class DailyStatOut(BaseModel):
     date: str
@@ -1,19 +1,39 @@
 import uuid
-import time
-from datetime import datetime, timezone
-from celery import shared_task
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+import redis
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from app.core.celery_app import celery_app
 from app.core.database import SessionLocal
+from app.core.redis_client import get_redis
 from app.core.config import settings
-from app.core.security import decrypt_token
-from app.core.ai.classifier import classify_comment
-from app.core.ai.responder import generate_reply
+from app.core import lease, pacing, polling, quota, stats
+from app.core import youtube as youtube_client
+from app.core import youtube_quota
+from app.core.ai.classifier import classify_comments_batch, known_categories
+from app.core.ai import reply_cache
+from app.core.ai.gateway import TokenUsage
+from app.core.ai.normalize import content_hash
+from app.core.ai.responder import SKIP_CATEGORIES, generate_reply, classify_and_reply
 from app.models.integration import SocialIntegration, Platform
-from app.models.comment import Comment, Response as CommentResponse, ResponseStatus, CommentCategory
+from app.models.comment import Comment, Response as CommentResponse, ResponseStatus
 from app.models.user import User
 
+# Pipeline do agente, uma task por etapa (filas e concorrência em app/core/celery_app.py):
+#
+#   ingest   run_agent_for_integration  busca comentários novos e os grava (sem categoria)
+#   classify classify_comments          classifica em lote os que ainda não têm categoria
+#   generate generate_replies           gera as respostas (pendentes ou na fila de envio)
+#   send     send_replies/send_reply    envia as respostas do Piloto Automático, no ritmo do canal
+#
+# Cada etapa recebe só IDs, relê o estado do banco e é idempotente, então pode
+# ser repetida pelo retry da própria etapa sem refazer as anteriores. O lease da
+# integração (app/core/lease.py) passa de uma etapa para a seguinte.
+
 
 def _get_db() -> Session:
     return SessionLocal()
@@ -21,7 +41,13 @@ def _get_db() -> Session:
 
 @celery_app.task(bind=True, name="app.tasks.agent_runner.run_agent_for_integration", max_retries=3)
 def run_agent_for_integration(self, integration_id: str):
-    """Executa o agente de resposta para uma integração específica (multi-tenant)."""
+    """Etapa ingest: busca os comentários novos da integração e inicia o pipeline."""
+    # Uma execução por integração por vez (beat, retries e execuções manuais)
+    run_lease = lease.IntegrationLease(integration_id)
+    if not run_lease.acquire():
+        return {"status": "already_running"}
+
+    handed_off = False
     db = _get_db()
     try:
         integration = db.query(SocialIntegration).filter(
@@ -41,260 +67,862 @@ def run_agent_for_integration(self, integration_id: str):
         if not config:
             return {"status": "no_config"}
 
-        # Verificar quota diária (Plano)
-        from datetime import date, timedelta
-        from sqlalchemy import func
-        today_date = date.today()
-        today_str = today_date.isoformat()
-        
-        sent_today = db.query(func.count(CommentResponse.id)).join(Comment).filter(
-            Comment.integration_id == integration_id,
-            CommentResponse.status == ResponseStatus.sent,
-            func.date(CommentResponse.sent_at) == today_str,
-        ).scalar() or 0
- 
-        daily_limit_plan = user.plan.max_responses_per_day
-        if sent_today >= daily_limit_plan:
-            return {"status": "plan_daily_limit_reached", "sent_today": sent_today}
-
-        # Verificar Intervalo Fixo (Delay)
-        if config.response_delay_minutes > 0:
-            last_sent = db.query(CommentResponse.sent_at).join(Comment).filter(
-                Comment.integration_id == integration_id,
-                CommentResponse.status == ResponseStatus.sent
-            ).order_by(CommentResponse.sent_at.desc()).first()
-
-            if last_sent and last_sent[0]:
-                last_sent_time = last_sent[0]
-                if last_sent_time.tzinfo is None:
-                    last_sent_time = last_sent_time.replace(tzinfo=timezone.utc)
-                minutes_since = (datetime.now(timezone.utc) - last_sent_time).total_seconds() / 60
-                if minutes_since < config.response_delay_minutes:
-                    return {"status": "delayed", "minutes_since": minutes_since, "required": config.response_delay_minutes}
-
-        # Verificar Quotas Horárias (Anti-Spam)
-        one_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
-
-        sent_this_hour = db.query(func.count(CommentResponse.id)).join(Comment).filter(
-            Comment.integration_id == integration_id,
-            CommentResponse.status == ResponseStatus.sent,
-            CommentResponse.sent_at >= one_hour_ago
-        ).scalar() or 0
-
-        if sent_this_hour >= config.max_comments_per_hour:
-            return {"status": "hourly_limit_reached", "sent_hour": sent_this_hour}
-
-        # Obter serviço YouTube
-        if integration.platform == Platform.youtube:
-            # A quota restante é o menor valor entre os limites
-            remaining = min(
-                daily_limit_plan - sent_today,
-                config.max_comments_per_hour - sent_this_hour
-            )
-            result = _run_youtube_agent(integration, config, user, db, remaining)
-
+        result = _run_integration(integration, config, user, db)
 
-        else:
-            result = {"status": "platform_not_supported"}
-
-        # Atualizar last_run_at
-        integration.last_run_at = datetime.now(timezone.utc)
+        # Atualizar last_run_at e agendar a próxima execução
+        now = datetime.now(timezone.utc)
+        result["poll_interval_seconds"] = _schedule_next_poll(
+            db, integration, config, user, result.get("new_comments", 0), now
+        )
+        if result["status"] == "youtube_quota_exhausted":
+            _park_until_quota_reset(integration, now)
+        integration.last_run_at = now
         db.commit()
+
+        # Respostas que ficaram para depois do reset da quota voltam para a etapa send
+        parked_ids = quota.pop_parked(db, integration_id) if result["status"] == "ingested" else []
+        if parked_ids:
+            send_replies.delay(integration_id, parked_ids)
+            result["resumed"] = len(parked_ids)
+
+        comment_ids = result.pop("comment_ids", [])
+        if comment_ids:
+            classify_comments.delay(integration_id, comment_ids, run_lease.hand_off())
+            handed_off = True
+        result["queued"] = len(comment_ids)
         return result
 
     except Exception as exc:
         db.rollback()
+        if youtube_quota.is_quota_error(exc):
+            # Quota do projeto esgotada: estaciona até o reset em vez de tentar a cada minuto
+            youtube_quota.mark_exhausted()
+            _park_integration(db, integration_id)
+            return {"status": "youtube_quota_exhausted", "reason": youtube_quota.EXHAUSTED}
         raise self.retry(exc=exc, countdown=60)
     finally:
         db.close()
+        if not handed_off:
+            run_lease.release()
+
+
+def _run_integration(integration: SocialIntegration, config, user: User, db: Session) -> dict:
+    """Confere as quotas e busca os comentários novos da plataforma."""
+    # Quotas (contadores em Redis, sem consultar a tabela responses)
+    usage = quota.get_usage(db, integration.id)
+    sent_today = usage.sent_today
+    sent_this_hour = usage.sent_this_hour
+
+    # Verificar quota diária (Plano)
+    daily_limit_plan = user.plan.max_responses_per_day
+    if sent_today >= daily_limit_plan:
+        return {"status": "plan_daily_limit_reached", "sent_today": sent_today}
+
+    # Verificar Intervalo Fixo (Delay)
+    if config.response_delay_minutes > 0 and usage.last_sent_at:
+        minutes_since = (datetime.now(timezone.utc) - usage.last_sent_at).total_seconds() / 60
+        if minutes_since < config.response_delay_minutes:
+            return {"status": "delayed", "minutes_since": minutes_since, "required": config.response_delay_minutes}
+
+    # Verificar Quotas Horárias (Anti-Spam)
+    if sent_this_hour >= config.max_comments_per_hour:
+        return {"status": "hourly_limit_reached", "sent_hour": sent_this_hour}
+
+    if integration.platform == Platform.youtube:
+        return _ingest_youtube(integration, config, db)
+
+    return {"status": "platform_not_supported"}
+
+
+def _schedule_next_poll(
+    db: Session,
+    integration: SocialIntegration,
+    config,
+    user: User,
+    new_comments: int,
+    now: datetime,
+) -> int:
+    """Atualiza a taxa de chegada e grava poll_interval_seconds/next_run_at da integração."""
+    if integration.last_run_at:
+        elapsed = (now - _as_utc(integration.last_run_at)).total_seconds()
+        integration.comment_rate_per_hour = polling.update_arrival_rate(
+            integration.comment_rate_per_hour, new_comments, elapsed
+        )
 
+    # Folga de quota: a fatia diária da YouTube Data API vale para a busca e o envio;
+    # os limites do plano só contam no Piloto Automático (no modo manual nada é enviado aqui)
+    headroom = 1.0
+    if integration.platform == Platform.youtube:
+        headroom = youtube_quota.usage(integration.id, youtube_quota.budget_for(db, integration), now).headroom
+    if config.auto_mode:
+        usage = quota.get_usage(db, integration.id)
+        daily_limit = user.plan.max_responses_per_day
+        hourly_limit = config.max_comments_per_hour
+        headroom = min(
+            headroom,
+            (daily_limit - usage.sent_today) / daily_limit if daily_limit > 0 else 0.0,
+            (hourly_limit - usage.sent_this_hour) / hourly_limit if hourly_limit > 0 else 0.0,
+        )
 
-def _run_youtube_agent(integration: SocialIntegration, config, user: User, db: Session, remaining_quota: int) -> dict:
-    from google.oauth2.credentials import Credentials
-    from googleapiclient.discovery import build
+    interval = polling.next_poll_interval(
+        integration.comment_rate_per_hour or 0.0,
+        headroom,
+        polling.in_working_window(config, user.timezone, now),
+    )
+    next_run = now + timedelta(seconds=interval)
+    # Se a próxima execução cair fora da janela, pula direto para a abertura seguinte
+    integration.next_run_at = polling.next_window_open(config, user.timezone, next_run) or next_run
+    integration.poll_interval_seconds = interval
+    return interval
 
-    access_token = decrypt_token(integration.access_token_enc or "")
-    refresh_token = decrypt_token(integration.refresh_token_enc or "")
 
-    creds = Credentials(
-        token=access_token,
-        refresh_token=refresh_token or None,
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=settings.GOOGLE_CLIENT_ID,
-        client_secret=settings.GOOGLE_CLIENT_SECRET,
-    )
+def _park_until_quota_reset(integration: SocialIntegration, now: Optional[datetime] = None):
+    """Sem quota da YouTube Data API hoje: a próxima execução fica para depois do reset."""
+    reset = youtube_quota.next_reset(now)
+    if not integration.next_run_at or _as_utc(integration.next_run_at) < reset:
+        integration.next_run_at = reset
 
-    youtube = build("youtube", "v3", credentials=creds)
 
-    responded = 0
-    max_run = min(config.max_responses_per_run, remaining_quota)
-    if config.response_delay_minutes > 0:
-        max_run = 1  # Se há delay, manda no máximo 1 por vez para não mandar em bolo
+def _park_integration(db: Session, integration_id: str):
+    integration = db.query(SocialIntegration).filter(SocialIntegration.id == integration_id).first()
+    if integration:
+        _park_until_quota_reset(integration)
+        db.commit()
+
 
-    # Buscar comentários recentes do canal
+@celery_app.task(
+    bind=True,
+    name="app.tasks.agent_runner.classify_comments",
+    max_retries=3,
+    default_retry_delay=10,
+)
+def classify_comments(self, integration_id: str, comment_ids: List[str], lease_token: Optional[str] = None):
+    """Etapa classify: classifica em lote os comentários ainda sem categoria."""
+    run_lease = lease.IntegrationLease.resume(integration_id, lease_token)
+    db = _get_db()
     try:
-        comment_threads = youtube.commentThreads().list(
-            part="snippet",
-            allThreadsRelatedToChannelId=integration.channel_id,
-            textFormat="plainText",
-            maxResults=50,
-            order="time",
-        ).execute()
-    except Exception as e:
-        return {"status": "youtube_api_error", "error": str(e)}
+        integration = db.query(SocialIntegration).filter(SocialIntegration.id == integration_id).first()
+        if not integration:
+            run_lease.release()
+            return {"status": "integration_not_found"}
 
-    for item in comment_threads.get("items", []):
-        if responded >= max_run:
-            break
+        comments = db.query(Comment).filter(
+            Comment.id.in_(comment_ids),
+            Comment.category.is_(None),
+        ).all()
+        texts = [comment.text for comment in comments]
 
-        snippet = item["snippet"]["topLevelComment"]["snippet"]
-        external_id = item["id"]
-        text = snippet.get("textDisplay", "")
-        author = snippet.get("authorDisplayName", "")
-        author_channel_id = snippet.get("authorChannelId", {}).get("value", "")
-        video_id = snippet.get("videoId", "")
+        usage = TokenUsage()
+        if settings.AI_COMBINED_MODE:
+            # A classificação vem junto com a resposta (etapa generate); aqui só o que já é conhecido
+            categories = known_categories(texts)
+        else:
+            language = integration.user.language if integration.user else "pt-BR"
+            categories = classify_comments_batch(
+                texts, language, tenant_id=integration.user_id, usage=usage
+            )
+        for comment, category in zip(comments, categories):
+            if category:
+                comment.category = category
+        stats.record_daily_stats(db, integration_id, tokens=usage.total_tokens)
+        db.commit()
 
-        # Verificar blacklist
-        text_lower = text.lower()
-        if any(bw.lower() in text_lower for bw in (config.blacklist_words or [])):
-            continue
+        generate_replies.delay(integration_id, comment_ids, run_lease.hand_off())
+        return {"status": "classified", "classified": len(comments), "tokens_used": usage.total_tokens}
 
-        # Verificar se já respondido
-        existing = db.query(Comment).filter(Comment.external_comment_id == external_id).first()
-        if existing:
-            continue
+    except SQLAlchemyError as exc:
+        db.rollback()
+        raise self.retry(exc=exc, args=[integration_id, comment_ids, run_lease.hand_off()])
+    finally:
+        run_lease.stop()
+        db.close()
 
-        # Classificar comentário
-        category_str = classify_comment(text, integration.user.language if hasattr(integration, 'user') else "pt-BR")
-
-        # Verificar filtros de categoria
-        skip_map = {
-            "spam": config.skip_spam,
-            "ofensa": config.skip_offensive,
-            "elogio": not config.respond_to_praise,
-            "duvida": not config.respond_to_questions,
-            "neutro": not config.respond_to_neutral,
-            "critica": not config.respond_to_criticism,
-        }
-        if skip_map.get(category_str, False):
-            # Salvar como skipped
-            comment = Comment(
-                id=str(uuid.uuid4()),
-                integration_id=integration.id,
-                external_comment_id=external_id,
-                author=author,
-                author_channel_id=author_channel_id,
-                text=text,
-                category=category_str,
-                video_id=video_id,
-                received_at=datetime.now(timezone.utc),
-            )
-            db.add(comment)
-            response = CommentResponse(
-                id=str(uuid.uuid4()),
-                comment_id=comment.id,
-                text="",
-                status=ResponseStatus.skipped,
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.agent_runner.generate_replies",
+    max_retries=3,
+    default_retry_delay=10,
+)
+def generate_replies(self, integration_id: str, comment_ids: List[str], lease_token: Optional[str] = None):
+    """Etapa generate: gera as respostas dos comentários que ainda não têm uma.
+
+    No Piloto Automático gera no máximo o que a quota ainda permite enviar e
+    passa as respostas (status queued) para a etapa send; no modo manual elas
+    ficam pendentes de aprovação.
+    """
+    run_lease = lease.IntegrationLease.resume(integration_id, lease_token)
+    db = _get_db()
+    try:
+        integration = db.query(SocialIntegration).filter(
+            SocialIntegration.id == integration_id,
+            SocialIntegration.is_active == True
+        ).first()
+        user = integration.user if integration else None
+        config = integration.agent_config if integration else None
+        if not integration or not user or not user.plan or not config:
+            run_lease.release()
+            return {"status": "integration_not_found"}
+
+        comments = db.query(Comment).outerjoin(Comment.response).filter(
+            Comment.id.in_(comment_ids),
+            CommentResponse.id.is_(None),
+        ).order_by(Comment.received_at, Comment.created_at).all()
+
+        max_run = _remaining_sends(db, integration, config, user) if config.auto_mode else len(comments)
+        result = _generate(db, integration, config, comments, max_run)
+
+        queued_ids = result.pop("queued_ids")
+        if queued_ids:
+            send_replies.delay(integration_id, queued_ids, run_lease.hand_off())
+        else:
+            run_lease.release()
+        return result
+
+    except SQLAlchemyError as exc:
+        db.rollback()
+        raise self.retry(exc=exc, args=[integration_id, comment_ids, run_lease.hand_off()])
+    finally:
+        run_lease.stop()
+        db.close()
+
+
+def _remaining_sends(db: Session, integration: SocialIntegration, config, user: User) -> int:
+    """Quantas respostas ainda cabem nesta execução do Piloto Automático."""
+    usage = quota.get_usage(db, integration.id)
+    # Respostas já na fila de envio contam como enviadas
+    in_flight = quota.queued_count(db, integration.id)
+    remaining = min(
+        user.plan.max_responses_per_day - usage.sent_today,
+        config.max_comments_per_hour - usage.sent_this_hour,
+    ) - in_flight
+
+    if integration.platform == Platform.youtube:
+        # Cada envio custa 50 unidades da fatia diária da integração
+        api_usage = youtube_quota.usage(integration.id, youtube_quota.budget_for(db, integration))
+        remaining = min(remaining, api_usage.sends_left - in_flight)
+
+    max_run = min(config.max_responses_per_run, remaining)
+    if config.response_delay_minutes > 0:
+        max_run = min(max_run, 1)  # Se há delay, manda no máximo 1 por vez para não mandar em bolo
+    return max(0, max_run)
+
+
+def _generate(db: Session, integration: SocialIntegration, config, comments: List[Comment], max_run: int) -> dict:
+    """Gera as respostas em ondas paralelas e grava os Response de cada onda."""
+    skip_categories = _skipped_categories(config)
+    combined = settings.AI_COMBINED_MODE
+    tenant_id = integration.user_id
+    run_usage = TokenUsage()
+    recorded_tokens = 0
+    persona = {
+        "persona_name": config.persona_name,
+        "tone": config.tone,
+        "custom_prompt": config.custom_prompt,
+        "language": config.language or "pt-BR",
+    }
+
+    generated = 0
+    queued_ids = []
+    pending = list(comments)
+    workers = max(1, settings.AGENT_LLM_WORKERS)
+
+    # Classificação/geração em paralelo (thread pool, sem acesso ao banco);
+    # a gravação continua na thread da task.
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending and generated < max_run:
+            # Uma onda não gera mais respostas do que a quota ainda permite
+            wave_size = min(workers, max_run - generated)
+            wave, pending = pending[:wave_size], pending[wave_size:]
+            # Atributos lidos aqui: o commit da onda anterior os expirou, e o
+            # recarregamento não pode acontecer nas threads (sessão não é thread-safe)
+            inputs = [(comment.text, getattr(comment.category, "value", comment.category)) for comment in wave]
+            results = pool.map(
+                lambda item: _prepare_reply(item[0], item[1], persona, skip_categories, combined, tenant_id),
+                inputs,
             )
-            db.add(response)
-            db.flush()
-            continue
 
-        # Gerar resposta
-        reply_text = generate_reply(
-            comment=text,
-            category=category_str,
-            persona_name=config.persona_name,
-            tone=config.tone,
-            custom_prompt=config.custom_prompt,
-        )
-        if not reply_text:
-            continue
+            for comment, (category_str, reply_text, usage) in zip(wave, results):
+                run_usage.merge(usage)
+
+                if category_str in skip_categories or category_str in SKIP_CATEGORIES:
+                    status_val, text = ResponseStatus.skipped, ""
+                elif not reply_text:
+                    # Falha do LLM: sem Response o comentário continua no backlog e é
+                    # tentado de novo na próxima execução, até AGENT_GENERATE_MAX_ATTEMPTS
+                    if _generation_attempts(comment.id) < settings.AGENT_GENERATE_MAX_ATTEMPTS:
+                        continue
+                    status_val, text = ResponseStatus.failed, ""
+                else:
+                    status_val = ResponseStatus.queued if config.auto_mode else ResponseStatus.pending
+                    text = reply_text
+
+                response = CommentResponse(
+                    id=str(uuid.uuid4()),
+                    comment_id=comment.id,
+                    text=text,
+                    status=status_val,
+                    ai_model_used="gpt-4o-mini" if text else None,
+                    tokens_used=usage.total_tokens,
+                    error_message="Falha ao gerar a resposta" if status_val == ResponseStatus.failed else None,
+                )
+                try:
+                    with db.begin_nested():
+                        db.add(response)
+                except IntegrityError:
+                    continue  # outra execução já respondeu este comentário
+                comment.category = category_str
+
+                stats.record_daily_stats(
+                    db,
+                    integration.id,
+                    skipped=1 if status_val == ResponseStatus.skipped else 0,
+                    failed=1 if status_val == ResponseStatus.failed else 0,
+                    tokens=usage.total_tokens,
+                )
+                recorded_tokens += usage.total_tokens
+                if status_val == ResponseStatus.queued:
+                    queued_ids.append(response.id)
+                if status_val in (ResponseStatus.queued, ResponseStatus.pending):
+                    generated += 1
+            db.commit()
 
-        # Salvar comentário
-        comment = Comment(
-            id=str(uuid.uuid4()),
-            integration_id=integration.id,
-            external_comment_id=external_id,
-            author=author,
-            author_channel_id=author_channel_id,
-            text=text,
-            category=category_str,
-            video_id=video_id,
-            received_at=datetime.now(timezone.utc),
-        )
-        db.add(comment)
-        db.flush()
+    # Tokens que não geraram registro
+    stats.record_daily_stats(db, integration.id, tokens=run_usage.total_tokens - recorded_tokens)
+    db.commit()
+    quota.track_queued(integration.id, queued_ids)
+    return {
+        "status": "generated",
+        "generated": generated,
+        "tokens_used": run_usage.total_tokens,
+        "queued_ids": queued_ids,
+    }
+
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.agent_runner.send_replies",
+    max_retries=5,
+    default_retry_delay=30,
+)
+def send_replies(self, integration_id: str, response_ids: List[str], lease_token: Optional[str] = None):
+    """Etapa send: agenda o envio das respostas do Piloto Automático (status queued).
+
+    Cada resposta reserva um horário no token bucket do canal
+    (app/core/pacing.py) e vira, sozinha ou num lote com as que vencem no
+    mesmo horário, uma task send_reply_batch com esse countdown — nada de
+    sleep no worker (ver schedule_send_batches).
+    """
+    run_lease = lease.IntegrationLease.resume(integration_id, lease_token)
+    db = _get_db()
+    try:
+        integration = db.query(SocialIntegration).filter(SocialIntegration.id == integration_id).first()
+        if not integration:
+            return {"status": "integration_not_found"}
 
-        status_val = ResponseStatus.sent if config.auto_mode else ResponseStatus.pending
-        response = CommentResponse(
-            id=str(uuid.uuid4()),
-            comment_id=comment.id,
-            text=reply_text,
-            status=status_val,
-            ai_model_used="gpt-4o-mini",
-        )
-        db.add(response)
-        db.flush()
-
-        # Enviar resposta automaticamente apenas se Piloto Automático estiver ligado
-        if config.auto_mode:
-            try:
-                youtube.comments().insert(
-                    part="snippet",
-                    body={"snippet": {"parentId": external_id, "textOriginal": reply_text}}
-                ).execute()
-                response.sent_at = datetime.now(timezone.utc)
-                responded += 1
-                time.sleep(2)  # respeitar rate limits
-            except Exception as e:
-                response.status = ResponseStatus.failed
-                response.error_message = str(e)
+        queued = {row[0] for row in db.query(CommentResponse.id).filter(
+            CommentResponse.id.in_(response_ids),
+            CommentResponse.status == ResponseStatus.queued,
+        ).all()}
+        ids = [response_id for response_id in response_ids if response_id in queued]
+        if ids:
+            # Estacionadas voltam a ser envios normais (não são retomadas de novo na próxima execução)
+            db.query(CommentResponse).filter(
+                CommentResponse.id.in_(ids),
+                CommentResponse.error_message.isnot(None),
+            ).update({CommentResponse.error_message: None}, synchronize_session=False)
+            db.commit()
 
-        db.commit()
+        delays = schedule_send_batches(send_reply_batch, integration, ids)
+        return {"status": "scheduled", "scheduled": len(ids), "last_send_in": max(delays, default=0)}
+
+    except SQLAlchemyError as exc:
+        db.rollback()
+        raise self.retry(exc=exc)
+    finally:
+        # As respostas queued já contam na quota (_remaining_sends): o lease pode ser liberado
+        run_lease.release()
+        db.close()
 
-    return {"status": "completed", "responded": responded}
 
+def schedule_send_batches(task, integration: SocialIntegration, response_ids: List[str]) -> List[float]:
+    """Reserva um horário de envio por resposta no bucket do canal e agenda um task por lote.
+
+    Um lote só junta respostas cujos horários vencem juntos — o burst de
+    SEND_BURST do bucket —, até YOUTUBE_SEND_BATCH_SIZE; as demais saem uma a
+    uma, cada uma no seu horário. Assim o lote nunca fura SEND_MIN_INTERVAL.
+    """
+    delays = pacing.reserve_send_slots(pacing.channel_key(integration.platform, integration.channel_id), len(response_ids))
+    size = max(1, settings.YOUTUBE_SEND_BATCH_SIZE)
+    start = 0
+    while start < len(response_ids):
+        end = start + 1
+        while end < len(response_ids) and end - start < size and delays[end] <= delays[start]:
+            end += 1
+        task.apply_async(args=[response_ids[start:end]], countdown=delays[start])
+        start = end
+    return delays
+
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.agent_runner.send_reply_batch",
+    max_retries=5,
+    default_retry_delay=30,
+)
+def send_reply_batch(self, response_ids: List[str]):
+    """Publica um lote de respostas queued no horário reservado pela etapa send."""
+    try:
+        return _send_queued(response_ids)
+    except SQLAlchemyError as exc:
+        raise self.retry(exc=exc)
+
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.agent_runner.send_reply",
+    max_retries=5,
+    default_retry_delay=30,
+)
+def send_reply(self, response_id: str):
+    """Publica uma resposta queued (lote de uma; mantida para tasks já enfileiradas)."""
+    try:
+        return _send_queued([response_id])
+    except SQLAlchemyError as exc:
+        raise self.retry(exc=exc)
 
-@celery_app.task(name="app.tasks.agent_runner.send_single_reply")
-def send_single_reply(response_id: str):
-    """Envia uma resposta aprovada manualmente."""
+
+def _send_queued(response_ids: List[str]) -> dict:
     db = _get_db()
     try:
-        response = db.query(CommentResponse).filter(CommentResponse.id == response_id).first()
-        if not response or response.status != ResponseStatus.pending:
+        # Trava as linhas: uma entrega duplicada da task não envia duas vezes
+        responses = _locked_responses(db, response_ids, ResponseStatus.queued)
+        if not responses:
+            return {"status": "not_queued"}
+        return _deliver(db, responses, QUOTA_PARKED_MESSAGE)
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.agent_runner.send_approved_replies")
+def send_approved_replies(response_ids: List[str]):
+    """Envia um lote de respostas aprovadas manualmente (mesmo canal)."""
+    db = _get_db()
+    try:
+        responses = _locked_responses(db, response_ids, ResponseStatus.pending)
+        if not responses:
             return {"status": "not_pending"}
+        # Sem quota, continuam pendentes: o usuário pode aprovar de novo depois do reset
+        return _deliver(db, responses, "Quota diária da YouTube Data API esgotada; aprove de novo após o reset")
 
-        comment = response.comment
-        integration = comment.integration
+    except SQLAlchemyError as e:
+        db.rollback()
+        return {"status": "error", "error": str(e)}
+    finally:
+        db.close()
 
-        if integration.platform == Platform.youtube:
-            from google.oauth2.credentials import Credentials
-            from googleapiclient.discovery import build
 
-            creds = Credentials(
-                token=decrypt_token(integration.access_token_enc or ""),
-                refresh_token=decrypt_token(integration.refresh_token_enc or "") or None,
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=settings.GOOGLE_CLIENT_ID,
-                client_secret=settings.GOOGLE_CLIENT_SECRET,
+@celery_app.task(name="app.tasks.agent_runner.send_single_reply")
+def send_single_reply(response_id: str):
+    """Envia uma resposta aprovada manualmente."""
+    return send_approved_replies([response_id])
+
+
+QUOTA_PARKED_MESSAGE = "Quota diária da YouTube Data API esgotada; o envio será retomado após o reset"
+
+
+def _locked_responses(db: Session, response_ids: List[str], status: ResponseStatus) -> List[CommentResponse]:
+    """Respostas do lote ainda no status esperado, travadas e na ordem recebida."""
+    rows = db.query(CommentResponse).filter(
+        CommentResponse.id.in_(response_ids),
+        CommentResponse.status == status,
+    ).with_for_update(skip_locked=True).all()
+    order = {response_id: i for i, response_id in enumerate(response_ids)}
+    return sorted(rows, key=lambda response: order[response.id])
+
+
+def _deliver(db: Session, responses: List[CommentResponse], quota_message: str) -> dict:
+    """Envia as respostas (todas da mesma integração) e grava o resultado de cada uma.
+
+    As barradas pela quota da YouTube Data API não mudam de status: ficam com
+    quota_message e, no Piloto Automático, a integração espera o reset.
+    """
+    integration = responses[0].comment.integration
+    auto_mode = responses[0].status == ResponseStatus.queued
+    if integration.platform == Platform.youtube:
+        outcomes = _send_youtube_batch(db, integration, responses)
+    else:
+        outcomes = {response.id: None for response in responses}
+
+    sent, failed, parked = [], [], []
+    response_time = 0.0
+    for response in responses:
+        error = outcomes[response.id]
+        if error is None:
+            response.status = ResponseStatus.sent
+            response.sent_at = datetime.now(timezone.utc)
+            response.error_message = None
+            response_time += stats.response_time_seconds(response.comment.received_at, response.sent_at)
+            sent.append(response)
+        elif isinstance(error, youtube_quota.QuotaDenied):
+            response.error_message = quota_message
+            parked.append(response.id)
+        else:
+            response.status = ResponseStatus.failed
+            response.error_message = str(error)
+            failed.append(response.id)
+
+    if parked and auto_mode:
+        _park_until_quota_reset(integration)
+    stats.record_daily_stats(db, integration.id, sent=len(sent), failed=len(failed), response_time_s=response_time)
+    db.commit()
+    for response in sent:
+        quota.record_send(integration.id, response.sent_at, response.id)
+    quota.settle_queued(integration.id, [response.id for response in sent] + failed)
+    if parked and auto_mode:
+        quota.park(integration.id, parked)
+
+    if len(responses) == 1:
+        return {"status": "parked" if parked else responses[0].status.value}
+    return {"status": "delivered", "sent": len(sent), "failed": len(failed), "parked": len(parked)}
+
+
+def _send_youtube_batch(db: Session, integration: SocialIntegration, responses: List[CommentResponse]) -> dict:
+    """comments.insert de várias respostas em lotes (BatchHttpRequest): uma requisição HTTP por lote.
+
+    As 50 unidades de cada envio são reservadas na quota do dia antes. Devolve
+    {response_id: None (enviada) | QuotaDenied | exceção do envio}; um
+    quotaExceeded do Google também marca o projeto como esgotado.
+    """
+    outcomes = {}
+    budget = youtube_quota.budget_for(db, integration)
+    reserved = []
+    for i, response in enumerate(responses):
+        denied = youtube_quota.reserve(integration.id, "comments.insert", budget)
+        if denied:
+            # A quota do dia só diminui: as demais também não cabem
+            for rest in responses[i:]:
+                outcomes[rest.id] = youtube_quota.QuotaDenied(denied)
+            break
+        reserved.append(response)
+
+    def on_result(request_id, _, exception):
+        if exception is not None and youtube_quota.is_quota_error(exception):
+            youtube_quota.mark_exhausted()
+            exception = youtube_quota.QuotaDenied(youtube_quota.EXHAUSTED)
+        outcomes[request_id] = exception
+
+    def insert(response):
+        return youtube.comments().insert(
+            part="snippet",
+            body={"snippet": {"parentId": response.comment.external_comment_id, "textOriginal": response.text}}
+        )
+
+    try:
+        youtube = youtube_client.get_youtube(integration)
+    except Exception as exc:
+        for response in reserved:
+            on_result(response.id, None, exc)
+        return outcomes
+
+    size = max(1, settings.YOUTUBE_SEND_BATCH_SIZE)
+    for start in range(0, len(reserved), size):
+        chunk = reserved[start:start + size]
+        try:
+            if len(chunk) == 1:
+                on_result(chunk[0].id, insert(chunk[0]).execute(), None)
+                continue
+            batch = youtube.new_batch_http_request(callback=on_result)
+            for response in chunk:
+                batch.add(insert(response), request_id=response.id)
+            batch.execute()
+        except Exception as exc:
+            for response in chunk:
+                if response.id not in outcomes:
+                    on_result(response.id, None, exc)
+    return outcomes
+
+
+def _prepare_reply(
+    text: str,
+    category: Optional[str],
+    persona: dict,
+    skip_categories: set,
+    combined: bool,
+    tenant_id: str,
+) -> Tuple[Optional[str], Optional[str], TokenUsage]:
+    """Etapa de LLM de um comentário: retorna (categoria, resposta, uso de tokens).
+
+    Não toca no banco nem em objetos ORM — é executada em threads do pool.
+    """
+    usage = TokenUsage()
+    reply_text = None
+    key = reply_cache.cache_key(text, **persona)
+
+    if combined and category is None:
+        cached = reply_cache.get_cached_reply(key)
+        if cached and cached.get("category"):
+            category = cached["category"]
+            reply_text = cached["reply"] if category not in skip_categories else None
+        else:
+            category, reply_text = classify_and_reply(
+                comment=text,
+                skip_categories=skip_categories,
+                tenant_id=tenant_id,
+                usage=usage,
+                **persona,
             )
-            youtube = build("youtube", "v3", credentials=creds)
-            youtube.comments().insert(
-                part="snippet",
-                body={"snippet": {"parentId": comment.external_comment_id, "textOriginal": response.text}}
-            ).execute()
-
-        response.status = ResponseStatus.sent
-        response.sent_at = datetime.now(timezone.utc)
-        db.commit()
-        return {"status": "sent"}
+            reply_cache.store_reply(key, category, reply_text)
+    elif category not in skip_categories:
+        cached = reply_cache.get_cached_reply(key)
+        if cached:
+            reply_text = cached["reply"]
+        else:
+            reply_text = generate_reply(
+                comment=text,
+                category=category,
+                tenant_id=tenant_id,
+                usage=usage,
+                **persona,
+            )
+            reply_cache.store_reply(key, category, reply_text)
+    return category, reply_text, usage
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _published_at(item: dict) -> Optional[datetime]:
+    """publishedAt (RFC 3339) do comentário de topo da thread."""
+    raw = item["snippet"]["topLevelComment"]["snippet"].get("publishedAt")
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        return None
 
+
+def _known_external_ids(db: Session, external_ids: list) -> set:
+    """IDs externos que já existem na tabela comments."""
+    if not external_ids:
+        return set()
+    return {row[0] for row in known_external_ids_query(db, external_ids).all()}
+
+
+def known_external_ids_query(db: Session, external_ids: list):
+    return db.query(Comment.external_comment_id).filter(
+        Comment.external_comment_id.in_(set(external_ids))
+    )
+
+
+def _fetch_new_threads(youtube, integration: SocialIntegration, budget: int) -> Tuple[list, Optional[str]]:
+    """Busca threads do canal, da mais nova para a mais antiga, até o watermark.
+
+    Sem watermark (primeira execução) busca só a primeira página. Com watermark,
+    segue o nextPageToken até encontrar um comentário mais antigo que ele,
+    atingir YOUTUBE_MAX_PAGES_PER_RUN ou acabar a quota do dia. Uma busca
+    interrompida continua do resume_page_token gravado na integração.
+
+    Retorna (threads, page_token): page_token é onde retomar se a busca parou
+    antes do watermark, None se chegou a ele ou acabaram as páginas. Levanta
+    QuotaDenied se não houver quota nem para a primeira página.
+    """
+    watermark = integration.last_comment_published_at
+    if watermark:
+        watermark = _as_utc(watermark)
+
+    items = []
+    page_token = integration.resume_page_token if watermark else None
+    for page_number in range(max(1, settings.YOUTUBE_MAX_PAGES_PER_RUN)):
+        params = dict(
+            part="snippet",
+            allThreadsRelatedToChannelId=integration.channel_id,
+            textFormat="plainText",
+            maxResults=settings.YOUTUBE_PAGE_SIZE,
+            order="time",
+        )
+        if page_token:
+            params["pageToken"] = page_token
+        denied = youtube_quota.reserve(integration.id, "commentThreads.list", budget)
+        if denied:
+            if page_number == 0:
+                raise youtube_quota.QuotaDenied(denied)
+            return items, page_token
+        try:
+            page = youtube.commentThreads().list(**params).execute()
+        except Exception as e:
+            if page_number == 0 or not youtube_quota.is_quota_error(e):
+                raise
+            youtube_quota.mark_exhausted()
+            return items, page_token
+
+        for item in page.get("items", []):
+            published = _published_at(item)
+            if watermark and published and published < watermark:
+                return items, None
+            items.append(item)
+
+        page_token = page.get("nextPageToken")
+        if not page_token or not watermark:
+            return items, None
+    return items, page_token
+
+
+def _generation_attempts(comment_id: str) -> int:
+    """Conta uma falha de geração do comentário e retorna o total (em Redis).
+
+    Sem Redis a contagem não avança — o comentário volta ao backlog até sair
+    da janela de AGENT_BACKLOG_HOURS.
+    """
+    key = f"replyai:generate_attempts:{comment_id}"
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.incr(key)
+        pipe.expire(key, settings.AGENT_BACKLOG_HOURS * 3600)
+        return int(pipe.execute()[0])
+    except redis.RedisError:
+        return 0
+
+
+def _skipped_categories(config) -> set:
+    """Categorias que a config do agente manda pular (não gerar resposta)."""
+    skip_map = {
+        "spam": config.skip_spam,
+        "ofensa": config.skip_offensive,
+        "elogio": not config.respond_to_praise,
+        "duvida": not config.respond_to_questions,
+        "neutro": not config.respond_to_neutral,
+        "critica": not config.respond_to_criticism,
+    }
+    return {category for category, skip in skip_map.items() if skip}
+
+
+def _ingest_youtube(integration: SocialIntegration, config, db: Session) -> dict:
+    """Grava os comentários novos do canal e devolve os IDs a processar.
+
+    Os IDs incluem o backlog da integração: comentários gravados nas últimas
+    AGENT_BACKLOG_HOURS que ainda não têm resposta (ex.: a quota acabou antes).
+    """
+    youtube = youtube_client.get_youtube(integration)
+
+    # Buscar comentários novos do canal (até o watermark da integração)
+    try:
+        threads, resume_token = _fetch_new_threads(youtube, integration, youtube_quota.budget_for(db, integration))
+    except youtube_quota.QuotaDenied as denied:
+        return {"status": "youtube_quota_exhausted", "reason": denied.reason}
     except Exception as e:
-        if db_response := db.query(CommentResponse).filter(CommentResponse.id == response_id).first():
-            db_response.status = ResponseStatus.failed
-            db_response.error_message = str(e)
+        if youtube_quota.is_quota_error(e):
+            youtube_quota.mark_exhausted()
+            return {"status": "youtube_quota_exhausted", "reason": youtube_quota.EXHAUSTED}
+        if integration.resume_page_token:
+            # Token de retomada recusado (ex.: expirou): a próxima busca recomeça do
+            # topo e percorre de novo as páginas até o watermark, que não avançou
+            integration.resume_page_token = None
             db.commit()
-        return {"status": "error", "error": str(e)}
-    finally:
-        db.close()
+        return {"status": "youtube_api_error", "error": str(e)}
+
+    # Processar do mais antigo para o mais novo
+    threads.reverse()
+
+    # Comentários já conhecidos resolvidos em uma única consulta (IN) para todas as páginas
+    known_ids = _known_external_ids(db, [item["id"] for item in threads])
+    new_comments = sum(1 for item in threads if item["id"] not in known_ids)
+
+    # Filtrar blacklist e comentários já gravados
+    comments = []
+    for item in threads:
+        snippet = item["snippet"]["topLevelComment"]["snippet"]
+        external_id = item["id"]
+        text = snippet.get("textDisplay", "")
+
+        # Verificar se já gravado (ou repetido entre páginas)
+        if external_id in known_ids:
+            continue
+        known_ids.add(external_id)
+
+        # Verificar blacklist
+        text_lower = text.lower()
+        if any(bw.lower() in text_lower for bw in (config.blacklist_words or [])):
+            continue
+
+        comments.append(Comment(
+            id=str(uuid.uuid4()),
+            integration_id=integration.id,
+            external_comment_id=external_id,
+            author=snippet.get("authorDisplayName", ""),
+            author_channel_id=snippet.get("authorChannelId", {}).get("value", ""),
+            text=text,
+            video_id=snippet.get("videoId", ""),
+            content_hash=content_hash(text),
+            received_at=_published_at(item) or datetime.now(timezone.utc),
+        ))
+
+    saved = _save_comments(db, comments)
+    stats.record_daily_stats(db, integration.id, received=saved)
+
+    # Mais novo já visto, somando o que a busca interrompida anterior viu
+    newest = integration.resume_published_at and _as_utc(integration.resume_published_at)
+    for item in threads:
+        published = _published_at(item)
+        if published and (not newest or published > newest):
+            newest = published
+
+    if resume_token:
+        # Parou antes do watermark (limite de páginas ou quota): o watermark fica
+        # onde está até a busca alcançá-lo, senão os comentários do meio se perderiam
+        integration.resume_page_token = resume_token
+        integration.resume_published_at = newest
+    else:
+        # Tudo entre o watermark e o mais novo está gravado (ou na blacklist)
+        if newest and (
+            not integration.last_comment_published_at
+            or newest > _as_utc(integration.last_comment_published_at)
+        ):
+            integration.last_comment_published_at = newest
+        integration.resume_page_token = None
+        integration.resume_published_at = None
+    db.commit()
+
+    return {
+        "status": "ingested",
+        "new_comments": new_comments,
+        "comment_ids": _backlog_comment_ids(db, integration.id),
+    }
+
+
+def _save_comments(db: Session, comments: List[Comment]) -> int:
+    """Grava os comentários em lote; se outra execução gravou algum, cai para um a um."""
+    if not comments:
+        return 0
+    try:
+        with db.begin_nested():
+            db.add_all(comments)
+        return len(comments)
+    except IntegrityError:
+        pass
+
+    saved = 0
+    for comment in comments:
+        try:
+            with db.begin_nested():
+                db.add(comment)
+            saved += 1
+        except IntegrityError:
+            continue
+    return saved
+
+
+def _backlog_comment_ids(db: Session, integration_id: str) -> List[str]:
+    """Comentários recentes da integração ainda sem resposta, do mais antigo para o mais novo."""
+    since = datetime.now(timezone.utc) - timedelta(hours=settings.AGENT_BACKLOG_HOURS)
+    rows = db.query(Comment.id).outerjoin(Comment.response).filter(
+        Comment.integration_id == integration_id,
+        Comment.created_at >= since,
+        CommentResponse.id.is_(None),
+    ).order_by(Comment.received_at, Comment.created_at).limit(settings.AGENT_BACKLOG_LIMIT).all()
+    return [row[0] for row in rows]
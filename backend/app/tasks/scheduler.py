@@ -1,26 +1,177 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
 from app.core.celery_app import celery_app
+from app.core import polling, youtube_quota
+from app.core.config import settings
 from app.core.database import SessionLocal
-from app.models.integration import SocialIntegration
+from app.core.lease import held_leases
+from app.models.integration import AgentConfig, SocialIntegration
+from app.models.user import User
 
 
 @celery_app.task(name="app.tasks.scheduler.schedule_active_agents")
 def schedule_active_agents():
-    """Executa a cada 15 minutos via Celery Beat.
-    Enfileira run_agent_for_integration para cada integração ativa."""
+    """Executa a cada minuto via Celery Beat.
+
+    Retira as integrações ativas cujo next_run_at já venceu (índice
+    ix_social_integrations_due) e as enfileira de uma vez, espalhadas ao longo
+    do tick com countdown aleatório. O custo de cada tick acompanha o trabalho
+    vencido, não o total de integrações.
+    """
     from app.tasks.agent_runner import run_agent_for_integration
 
     db = SessionLocal()
     try:
-        active = db.query(SocialIntegration).filter(
-            SocialIntegration.is_active == True
-        ).all()
+        now = datetime.now(timezone.utc)
+        due_ids, running = _pop_due_integrations(db, now)
+
+        # Quota da YouTube Data API esgotada: nada roda até o reset (meia-noite do Pacífico)
+        quota_reset = youtube_quota.exhausted_until(now)
+        if quota_reset and due_ids:
+            db.execute(
+                update(SocialIntegration)
+                .where(SocialIntegration.id.in_(due_ids))
+                .values(next_run_at=quota_reset)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return {"scheduled": 0, "parked_until": quota_reset.isoformat(), "skipped_quota": len(due_ids)}
+
+        # Fora do horário de atendimento: não enfileira, só reagenda para a abertura
+        closed = _defer_closed_integrations(db, due_ids, now)
+        db.commit()
+        due_ids = [integration_id for integration_id in due_ids if integration_id not in closed]
+
+        jitter = max(0, settings.SCHEDULER_JITTER_SECONDS)
+        with celery_app.producer_or_acquire() as producer:
+            for integration_id in due_ids:
+                run_agent_for_integration.apply_async(
+                    args=[integration_id],
+                    countdown=random.uniform(0, jitter),
+                    producer=producer,
+                )
+
+        return {
+            "scheduled": len(due_ids),
+            "skipped_running": len(running),
+            "skipped_closed": len(closed),
+        }
+    finally:
+        db.close()
+
+
+def _pop_due_integrations(db: Session, now: datetime) -> Tuple[List[str], Set[str]]:
+    """Retira as integrações vencidas: (IDs reagendados, IDs ainda rodando).
+
+    As vencidas são reagendadas provisoriamente para now + SCHEDULER_CLAIM_SECONDS,
+    o que impede que o próximo tick enfileire de novo a mesma integração; a
+    execução grava o next_run_at definitivo, e se a task se perder a
+    integração volta a vencer depois do claim.
+
+    As que ainda têm o lease (pipeline em classify/generate/send, depois de o
+    ingest já ter gravado o next_run_at) ficam de fora e não são alteradas:
+    continuam vencidas e rodam no primeiro tick depois de o lease ser liberado.
+    """
+    due_ids = list(db.execute(due_integrations_query(now)).scalars())
+    running = held_leases(due_ids)
+    claim_ids = [integration_id for integration_id in due_ids if integration_id not in running]
+    if claim_ids:
+        db.execute(
+            update(SocialIntegration)
+            .where(SocialIntegration.id.in_(claim_ids))
+            .values(next_run_at=now + timedelta(seconds=settings.SCHEDULER_CLAIM_SECONDS))
+            .execution_options(synchronize_session=False)
+        )
+    return claim_ids, running
+
+
+def due_integrations_query(now: datetime):
+    """Integrações ativas vencidas, as mais atrasadas primeiro (índice ix_social_integrations_due)."""
+    return select(SocialIntegration.id).where(
+        SocialIntegration.is_active == True,
+        or_(
+            SocialIntegration.next_run_at.is_(None),
+            SocialIntegration.next_run_at <= now,
+        ),
+    ).order_by(
+        SocialIntegration.next_run_at.asc().nulls_first()
+    ).limit(settings.SCHEDULER_BATCH_SIZE).with_for_update(skip_locked=True)
+
+
+def _defer_closed_integrations(db: Session, integration_ids: List[str], now: datetime) -> Set[str]:
+    """Reagenda para a próxima abertura as integrações fora da janela de atendimento.
 
-        count = 0
-        for integration in active:
-            # Enfileirar sempre que estiver ativo (para buscar novos comentários)
-            run_agent_for_integration.delay(integration.id)
-            count += 1
+    A janela é avaliada no fuso do usuário. A próxima abertura é calculada uma
+    vez por combinação (horário, dias, fuso) do tick, e as integrações com a
+    mesma abertura são reagendadas num único UPDATE. Retorna os IDs fechados.
+    """
+    if not integration_ids:
+        return set()
 
-        return {"scheduled": count}
+    rows = db.query(AgentConfig, User.timezone).join(
+        SocialIntegration, SocialIntegration.id == AgentConfig.integration_id
+    ).join(
+        User, User.id == SocialIntegration.user_id
+    ).filter(SocialIntegration.id.in_(integration_ids)).all()
+
+    next_open: Dict[tuple, datetime] = {}
+    deferred: Dict[datetime, List[str]] = defaultdict(list)
+    for config, tz_name in rows:
+        window = (
+            config.working_hours_start,
+            config.working_hours_end,
+            tuple(config.working_days) if config.working_days is not None else None,
+            tz_name,
+        )
+        if window not in next_open:
+            opens = polling.next_window_open(config, tz_name, now)
+            next_open[window] = opens or now + timedelta(seconds=settings.POLL_MAX_INTERVAL)
+        if next_open[window] > now:
+            deferred[next_open[window]].append(config.integration_id)
+
+    for run_at, ids in deferred.items():
+        db.execute(
+            update(SocialIntegration)
+            .where(SocialIntegration.id.in_(ids))
+            .values(next_run_at=run_at)
+            .execution_options(synchronize_session=False)
+        )
+    return {integration_id for ids in deferred.values() for integration_id in ids}
+
+
+@celery_app.task(name="app.tasks.scheduler.reconcile_quota_counters")
+def reconcile_quota_counters():
+    """Reconcilia os contadores de quota (Redis) com o Postgres."""
+    from app.core.quota import reconcile
+
+    db = SessionLocal()
+    try:
+        ids = [row[0] for row in active_integrations_query(db).all()]
+        for integration_id in ids:
+            reconcile(db, integration_id)
+        return {"reconciled": len(ids)}
+    finally:
+        db.close()
+
+
+def active_integrations_query(db: Session):
+    return db.query(SocialIntegration.id).filter(SocialIntegration.is_active == True)
+
+
+@celery_app.task(name="app.tasks.scheduler.refresh_expiring_tokens")
+def refresh_expiring_tokens():
+    """Renova os access tokens do Google que vencem antes do próximo ciclo."""
+    from app.core.credentials import refresh_expiring
+
+    db = SessionLocal()
+    try:
+        horizon = settings.TOKEN_REFRESH_MARGIN + settings.TOKEN_REFRESH_INTERVAL
+        return {"refreshed": refresh_expiring(db, horizon, settings.TOKEN_REFRESH_BATCH)}
     finally:
         db.close()
@@ -0,0 +1,80 @@
+import os
+import sys
+
+# Ajustar o sys.path para o Python encontrar o diretório "app" do backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uuid
+from collections import defaultdict
+from sqlalchemy import func
+
+from app.core.database import SessionLocal
+from app.models.comment import Comment, Response as CommentResponse, ResponseStatus, DailyStat
+
+
+def backfill():
+    """Recalcula os rollups DailyStat a partir do histórico de comments/responses.
+
+    Uso único (ou após correções manuais): sobrescreve as linhas existentes.
+    """
+    db = SessionLocal()
+    try:
+        rows = defaultdict(lambda: dict(
+            comments_received=0, responses_sent=0, responses_failed=0,
+            responses_skipped=0, tokens_consumed=0, avg_response_time_s=0.0,
+        ))
+
+        received = db.query(
+            Comment.integration_id, func.date(Comment.created_at), func.count(Comment.id)
+        ).group_by(Comment.integration_id, func.date(Comment.created_at)).all()
+        for integration_id, day, count in received:
+            rows[(integration_id, str(day))]["comments_received"] = count
+
+        # Tokens e pulados contam no dia em que o comentário foi processado
+        processed = db.query(
+            Comment.integration_id,
+            func.date(Comment.created_at),
+            func.sum(CommentResponse.tokens_used),
+            func.count(CommentResponse.id).filter(CommentResponse.status == ResponseStatus.skipped),
+        ).join(CommentResponse).group_by(Comment.integration_id, func.date(Comment.created_at)).all()
+        for integration_id, day, tokens, skipped in processed:
+            rows[(integration_id, str(day))]["tokens_consumed"] = int(tokens or 0)
+            rows[(integration_id, str(day))]["responses_skipped"] = skipped
+
+        # Enviados contam no dia do envio; falhas no dia da última atualização
+        sent = db.query(
+            Comment.integration_id,
+            func.date(CommentResponse.sent_at),
+            func.count(CommentResponse.id),
+            func.avg(func.extract("epoch", CommentResponse.sent_at - Comment.received_at)),
+        ).join(CommentResponse).filter(
+            CommentResponse.status == ResponseStatus.sent,
+            CommentResponse.sent_at.isnot(None),
+        ).group_by(Comment.integration_id, func.date(CommentResponse.sent_at)).all()
+        for integration_id, day, count, avg_s in sent:
+            rows[(integration_id, str(day))]["responses_sent"] = count
+            rows[(integration_id, str(day))]["avg_response_time_s"] = float(avg_s or 0.0)
+
+        failed_day = func.date(func.coalesce(CommentResponse.updated_at, CommentResponse.created_at))
+        failed = db.query(
+            Comment.integration_id, failed_day, func.count(CommentResponse.id)
+        ).join(CommentResponse).filter(
+            CommentResponse.status == ResponseStatus.failed,
+        ).group_by(Comment.integration_id, failed_day).all()
+        for integration_id, day, count in failed:
+            rows[(integration_id, str(day))]["responses_failed"] = count
+
+        db.query(DailyStat).delete(synchronize_session=False)
+        for (integration_id, day), values in rows.items():
+            db.add(DailyStat(id=str(uuid.uuid4()), integration_id=integration_id, date=day, **values))
+        db.commit()
+        print(f"Rollups recalculados: {len(rows)} linha(s) em daily_stats.")
+    except Exception as e:
+        db.rollback()
+        print(f"Erro ao recalcular rollups: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    backfill()
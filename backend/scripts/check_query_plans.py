@@ -0,0 +1,153 @@
+import os
+import sys
+
+# Ajustar o sys.path para o Python encontrar o diretório "app" do backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+from app.core.database import SessionLocal, engine
+from app.core.quota import recent_sends_query
+from app.api.v1.comments import comments_query, page_query, stats_totals_query, user_integrations_query
+from app.models.comment import DailyStat
+from app.tasks.agent_runner import known_external_ids_query
+from app.tasks.scheduler import active_integrations_query, due_integrations_query
+
+SAMPLE_ID = "00000000-0000-0000-0000-000000000000"
+SAMPLE_NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+SAMPLE_CURSOR = (SAMPLE_NOW, SAMPLE_ID, None)
+SAMPLE_SEARCH_CURSOR = (SAMPLE_NOW, SAMPLE_ID, 0.5)
+
+
+def _inbox_page(db, search=None, position=None, **filters):
+    """A mesma consulta de comments.list_comments (página seguinte, com cursor)."""
+    q = comments_query(db, [SAMPLE_ID], search=search, **filters)
+    return page_query(q, search=search, position=position, limit=20)
+
+
+# (descrição, consulta quente, índices esperados). Cada consulta é montada
+# pelo mesmo builder que o app usa; cada conjunto de índices precisa ter ao
+# menos um deles no plano.
+HOT_QUERIES = [
+    (
+        "comments.list_comments (inbox, keyset)",
+        lambda db: _inbox_page(db, position=SAMPLE_CURSOR),
+        [{"ix_comments_integration_created"}],
+    ),
+    (
+        "comments.list_comments (filtro de categoria, keyset)",
+        lambda db: _inbox_page(db, category="elogio", position=SAMPLE_CURSOR),
+        [{"ix_comments_integration_category_created"}],
+    ),
+    (
+        "comments.list_comments (busca no comentário e na resposta, com status)",
+        lambda db: _inbox_page(db, search="vídeo", status="pending", position=SAMPLE_SEARCH_CURSOR),
+        [
+            {"ix_comments_text_fts", "ix_comments_text_trgm"},
+            {"ix_responses_text_fts", "ix_responses_text_trgm"},
+        ],
+    ),
+    (
+        "comments: integrações do usuário",
+        lambda db: user_integrations_query(db, SAMPLE_ID),
+        [{"ix_social_integrations_user_active"}],
+    ),
+    (
+        "comments.dashboard_stats (rollups do dia)",
+        lambda db: stats_totals_query(db, [SAMPLE_ID]).filter(DailyStat.date == "2026-01-01"),
+        [{"uq_daily_stats_integration_date"}],
+    ),
+    (
+        "agent_runner: dedupe por external_comment_id",
+        lambda db: known_external_ids_query(db, ["a", "b"]),
+        [{"comments_external_comment_id_key"}],
+    ),
+    (
+        "quota.reconcile: envios recentes da integração",
+        lambda db: recent_sends_query(db, SAMPLE_ID, SAMPLE_NOW),
+        [{"ix_responses_status_sent_at", "ix_comments_integration_created"}],
+    ),
+    (
+        "scheduler: integrações vencidas",
+        lambda db: due_integrations_query(SAMPLE_NOW),
+        [{"ix_social_integrations_due"}],
+    ),
+    (
+        "reconcile_quota_counters: integrações ativas",
+        lambda db: active_integrations_query(db),
+        [{"ix_social_integrations_active"}],
+    ),
+]
+
+
+def _index_names(plan: dict) -> set:
+    names = set()
+    if "Index Name" in plan:
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) de um statement do app, executado como o app o executaria."""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    # Mesmo compilador do dialeto postgresql do engine: parâmetros (enums, datas,
+    # regconfig da busca) passam pelos bind processors, como nas consultas reais
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _explain(conn, db, query) -> dict:
+    statement = query(db)
+    statement = getattr(statement, "statement", statement)  # Query do ORM → Select
+    return conn.execute(_Explain(statement)).scalar()[0]["Plan"]
+
+
+def main() -> int:
+    """Roda EXPLAIN em cada consulta quente e confere se ela usa o índice esperado.
+
+    O plano é o que o Postgres escolheria de fato, com as estatísticas do
+    banco. Em bancos de desenvolvimento com poucas linhas ele prefere seq
+    scan; --force-index desliga enable_seqscan na sessão para conferir só se
+    o índice serve à consulta.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.splitlines()[0])
+    parser.add_argument("--force-index", action="store_true", help="SET enable_seqscan = off (bancos pequenos)")
+    args = parser.parse_args()
+
+    failures = 0
+    db = SessionLocal()
+    try:
+        with engine.connect() as conn:
+            if args.force_index:
+                conn.execute(text("SET enable_seqscan = off"))
+            for description, query, expected in HOT_QUERIES:
+                used = _index_names(_explain(conn, db, query))
+                missing = [indexes for indexes in expected if not used & indexes]
+                if not missing:
+                    print(f"✅ {description}: {', '.join(sorted(used & set().union(*expected)))}")
+                else:
+                    failures += 1
+                    wanted = " e ".join(" ou ".join(sorted(indexes)) for indexes in missing)
+                    print(f"❌ {description}: esperado {wanted}, plano usa {sorted(used) or 'seq scan'}")
+    finally:
+        db.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
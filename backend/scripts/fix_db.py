@@ -4,8 +4,8 @@ from app.core.database import SessionLocal, Base, engine
 def upgrade_tables():
     db = SessionLocal()
     try:
-        # Tenta adicionar as colunas potencialmente faltantes em agent_configs
-        colunas = [
+        # Tenta adicionar as colunas potencialmente faltantes em cada tabela
+        agent_configs = [
             "auto_mode BOOLEAN DEFAULT TRUE",
             "approval_required BOOLEAN DEFAULT FALSE",
             "working_hours_start VARCHAR(5) DEFAULT '00:00'",
@@ -23,24 +23,53 @@ def upgrade_tables():
             "max_comments_per_hour INTEGER DEFAULT 10",
             "response_delay_minutes INTEGER DEFAULT 0"
         ]
+        comments = [
+            "content_hash VARCHAR(64)",
+        ]
+        social_integrations = [
+            "last_comment_published_at TIMESTAMP WITH TIME ZONE",
+            "resume_page_token VARCHAR(255)",
+            "resume_published_at TIMESTAMP WITH TIME ZONE",
+            "comment_rate_per_hour DOUBLE PRECISION DEFAULT 0",
+            "poll_interval_seconds INTEGER",
+            "next_run_at TIMESTAMP WITH TIME ZONE",
+        ]
+        tabelas = {
+            "agent_configs": agent_configs,
+            "comments": comments,
+            "social_integrations": social_integrations,
+        }
 
-        for col in colunas:
-            try:
-                # Extrai apenas o nome da coluna (primeira palavra antes do espaço) para o IF NOT EXISTS ou equivalente
-                col_name = col.split(' ')[0]
-                db.execute(text(f"ALTER TABLE agent_configs ADD COLUMN IF NOT EXISTS {col_name} {col.split(' ', 1)[1]}"))
-            except Exception as e:
-                # Ignora se a coluna já existe e o IF NOT EXISTS não for suportado pelo PG antigo, ou outro erro transitório
-                db.rollback()
+        for tabela, colunas in tabelas.items():
+            for col in colunas:
                 try:
-                    db.execute(text(f"ALTER TABLE agent_configs ADD COLUMN {col}"))
-                except Exception as ex2:
+                    # Extrai apenas o nome da coluna (primeira palavra antes do espaço) para o IF NOT EXISTS ou equivalente
+                    col_name = col.split(' ')[0]
+                    db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS {col_name} {col.split(' ', 1)[1]}"))
+                except Exception as e:
+                    # Ignora se a coluna já existe e o IF NOT EXISTS não for suportado pelo PG antigo, ou outro erro transitório
                     db.rollback()
-                    pass # Já deve existir
-            
-            db.commit()
-            
-        print("Migração concluída com sucesso! Tabela 'agent_configs' atualizada.")
+                    try:
+                        db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {col}"))
+                    except Exception as ex2:
+                        db.rollback()
+                        pass # Já deve existir
+
+                db.commit()
+
+        # Status "queued" das respostas (migração 0006); ADD VALUE não roda dentro de transação
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+                text("ALTER TYPE responsestatus ADD VALUE IF NOT EXISTS 'queued'")
+            )
+
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_comments_content_hash ON comments (content_hash)"))
+        db.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_daily_stats_integration_date ON daily_stats (integration_id, date)"
+        ))
+        db.commit()
+
+        print(f"Migração concluída com sucesso! Tabelas atualizadas: {', '.join(tabelas)}.")
     except Exception as e:
         db.rollback()
         print(f"Erro geral durante a migração: {e}")
@@ -0,0 +1,34 @@
+import os
+import sys
+
+# Ajustar o sys.path para o Python encontrar o diretório "app" do backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.core.security import rotate_token
+from app.models.integration import SocialIntegration
+
+
+def rotate():
+    """Recifra os tokens OAuth gravados com a chave principal de FERNET_KEY.
+
+    Rode depois de colocar a chave nova na frente da lista (FERNET_KEY=nova,antiga);
+    ao terminar, a chave antiga pode sair da configuração.
+    """
+    db = SessionLocal()
+    try:
+        integrations = db.query(SocialIntegration).all()
+        for integration in integrations:
+            integration.access_token_enc = rotate_token(integration.access_token_enc)
+            integration.refresh_token_enc = rotate_token(integration.refresh_token_enc)
+        db.commit()
+        print(f"Tokens recifrados: {len(integrations)} integração(ões).")
+    except Exception as e:
+        db.rollback()
+        print(f"Erro ao recifrar tokens: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rotate()
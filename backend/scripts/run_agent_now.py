@@ -4,6 +4,7 @@ import sys
 # Ajustar o sys.path para o Python encontrar o diretório "app" do backend
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app.core.celery_app import celery_app
 from app.core.database import SessionLocal
 from app.models.integration import SocialIntegration
 from app.tasks.agent_runner import run_agent_for_integration
@@ -22,12 +23,17 @@ def main():
             return
 
         print(f"Iniciando agente para a integração '{integration.channel_name}' (ID: {integration.id})...")
-        print("Isso vai buscar os comentários na plataforma e gerar respostas via IA.")
-        
-        # Executa o agente de forma síncrona (imediata), ignorando a fila do Celery!
-        run_agent_for_integration(integration.id)
-        
-        print("\nPronto! Agente executado com sucesso.")
+        print("Isso vai buscar os comentários na plataforma, classificar, gerar respostas via IA e enviá-las.")
+
+        # run_agent_for_integration é só a etapa de ingestão; as etapas seguintes
+        # (classify → generate → send) são enfileiradas por ela. Em modo eager
+        # o pipeline inteiro roda aqui, de forma síncrona, ignorando as filas do
+        # Celery — inclusive o espaçamento entre envios (countdown)!
+        celery_app.conf.task_always_eager = True
+        celery_app.conf.task_eager_propagates = True
+        result = run_agent_for_integration(integration.id)
+
+        print(f"\nPronto! Agente executado com sucesso: {result}")
         print("Verifique os logs ou o painel para ver as respostas geradas.")
     except Exception as e:
         print(f"Ocorreu um erro ao rodar o agente: {e}")
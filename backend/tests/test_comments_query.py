@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.api.v1.comments import comments_query, page_query
+
+INTEGRATION_ID = "00000000-0000-0000-0000-000000000000"
+CURSOR = (datetime(2026, 1, 1, tzinfo=timezone.utc), INTEGRATION_ID, 0.5)
+
+
+def _compile(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"render_postcompile": True}))
+
+
+@pytest.mark.parametrize("status", [None, "pending", "sent"])
+@pytest.mark.parametrize("position", [None, CURSOR])
+def test_search_page_compiles_with_status_filter(status, position):
+    q = comments_query(Session(), [INTEGRATION_ID], status=status, search="video")
+    sql = _compile(page_query(q, search="video", position=position).statement)
+
+    # A relevância da resposta é uma subconsulta com o próprio FROM responses
+    assert "FROM responses \nWHERE responses.comment_id = comments.id" in sql
+    if status:
+        assert "JOIN responses ON comments.id = responses.comment_id" in sql
+
+
+def test_inbox_page_uses_keyset_cursor():
+    q = comments_query(Session(), [INTEGRATION_ID], category="elogio")
+    sql = _compile(page_query(q, position=(CURSOR[0], CURSOR[1], None)).statement)
+
+    assert "(comments.created_at, comments.id) <" in sql
+    assert "ORDER BY comments.created_at DESC, comments.id DESC" in sql
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import fakeredis
+import pytest
+
+from app.core.ai import concurrency
+from app.core.config import settings
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(concurrency, "get_redis", lambda: fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(settings, "AI_GLOBAL_MAX_CONCURRENCY", 3)
+    monkeypatch.setattr(settings, "AI_MAX_CONCURRENCY_PER_TENANT", 2)
+    return server
+
+
+def _run_concurrently(tenants):
+    lock = threading.Lock()
+    running = {"total": 0, "peak": 0}
+    per_tenant = {t: 0 for t in tenants}
+    peak_tenant = {t: 0 for t in tenants}
+
+    def call(tenant_id):
+        with concurrency.llm_slot(tenant_id):
+            with lock:
+                running["total"] += 1
+                per_tenant[tenant_id] += 1
+                running["peak"] = max(running["peak"], running["total"])
+                peak_tenant[tenant_id] = max(peak_tenant[tenant_id], per_tenant[tenant_id])
+            time.sleep(0.02)
+            with lock:
+                running["total"] -= 1
+                per_tenant[tenant_id] -= 1
+
+    threads = [threading.Thread(target=call, args=(t,)) for t in tenants]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return running["peak"], peak_tenant
+
+
+def test_global_and_tenant_limits_hold(fake_redis):
+    peak, peak_tenant = _run_concurrently(["a"] * 6 + ["b"] * 6)
+
+    assert peak == 3
+    assert max(peak_tenant.values()) <= 2
+
+
+def test_slots_are_released(fake_redis):
+    _run_concurrently(["a"] * 4)
+
+    client = fakeredis.FakeRedis(server=fake_redis, decode_responses=True)
+    assert client.zcard(concurrency._global_key()) == 0
+    assert client.zcard(concurrency._tenant_key("a")) == 0
+
+
+def test_expired_slot_is_reclaimed(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "AI_SLOT_TTL", -1)  # vagas já nascem vencidas
+    for i in range(3):
+        assert concurrency._try_acquire([concurrency._global_key()], [3], f"perdida-{i}")
+
+    with concurrency.llm_slot():
+        pass
+
+
+def test_without_redis_call_proceeds(monkeypatch):
+    def down():
+        raise concurrency.redis.ConnectionError("down")
+
+    monkeypatch.setattr(concurrency, "get_redis", down)
+    with concurrency.llm_slot("a"):
+        pass
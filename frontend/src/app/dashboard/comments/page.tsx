@@ -1,6 +1,6 @@
 "use client";
 import { useEffect, useState } from "react";
-import { api } from "@/lib/api";
+import { api, commentsApi } from "@/lib/api";
 import {
     MessageSquare, CheckCircle2, XCircle, Search, Filter,
     Youtube, Instagram, ExternalLink, Clock, AlertCircle,
@@ -21,7 +21,7 @@ interface Comment {
     response?: {
         id: string;
         text: string;
-        status: 'pending' | 'sent' | 'rejected' | 'failed';
+        status: 'pending' | 'queued' | 'sent' | 'rejected' | 'failed';
         sent_at?: string;
     };
 }
@@ -34,20 +34,23 @@ export default function CommentsPage() {
     const [stats, setStats] = useState<any>(null);
     const [editingId, setEditingId] = useState<string | null>(null);
     const [editText, setEditText] = useState("");
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    const commentParams = () => ({
+        search,
+        status: activeTab === 'all' ? undefined : activeTab
+    });
 
     const fetchComments = async () => {
         setLoading(true);
         try {
             const [commentsRes, statsRes] = await Promise.all([
-                api.get("/comments", {
-                    params: {
-                        search,
-                        status: activeTab === 'all' ? undefined : activeTab
-                    }
-                }),
+                api.get("/comments", { params: commentParams() }),
                 api.get("/comments/stats")
             ]);
-            setComments(commentsRes.data);
+            setComments(commentsRes.data.items);
+            setNextCursor(commentsRes.data.next_cursor);
             setStats(statsRes.data);
         } catch (error) {
             console.error("Erro ao buscar comentários", error);
@@ -56,6 +59,20 @@ export default function CommentsPage() {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const res = await api.get("/comments", { params: { ...commentParams(), cursor: nextCursor } });
+            setComments(prev => [...prev, ...res.data.items]);
+            setNextCursor(res.data.next_cursor);
+        } catch (error) {
+            console.error("Erro ao buscar comentários", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         const timer = setTimeout(() => {
             fetchComments();
@@ -73,6 +90,17 @@ export default function CommentsPage() {
         }
     };
 
+    const handleApproveAll = async () => {
+        const ids = comments.filter(c => c.response?.status === 'pending').map(c => c.id);
+        if (ids.length === 0) return;
+        try {
+            await commentsApi.approveMany(ids);
+            fetchComments();
+        } catch (error) {
+            console.error("Erro ao aprovar respostas", error);
+        }
+    };
+
     const handleReject = async (id: string) => {
         try {
             await api.patch(`/comments/${id}/reject`);
@@ -127,15 +155,27 @@ export default function CommentsPage() {
             </div>
 
             {/* Filtro de Busca */}
-            <div className="relative group max-w-md">
-                <Search size={18} className="absolute left-4 top-3.5 text-gray-500 group-focus-within:text-indigo-400 transition-colors" />
-                <input
-                    type="text"
-                    placeholder="Pesquisar por texto ou autor..."
-                    value={search}
-                    onChange={(e) => setSearch(e.target.value)}
-                    className="w-full bg-gray-900/30 border border-white/10 rounded-2xl py-3.5 pl-12 pr-4 outline-none focus:ring-2 focus:ring-indigo-500/30 transition-all font-medium"
-                />
+            <div className="flex flex-col md:flex-row md:items-center justify-between gap-4">
+                <div className="relative group max-w-md w-full">
+                    <Search size={18} className="absolute left-4 top-3.5 text-gray-500 group-focus-within:text-indigo-400 transition-colors" />
+                    <input
+                        type="text"
+                        placeholder="Pesquisar por texto ou autor..."
+                        value={search}
+                        onChange={(e) => setSearch(e.target.value)}
+                        className="w-full bg-gray-900/30 border border-white/10 rounded-2xl py-3.5 pl-12 pr-4 outline-none focus:ring-2 focus:ring-indigo-500/30 transition-all font-medium"
+                    />
+                </div>
+
+                {activeTab === 'pending' && comments.some(c => c.response?.status === 'pending') && (
+                    <button
+                        onClick={handleApproveAll}
+                        className="flex items-center gap-2 px-5 py-3 rounded-2xl bg-emerald-500/10 text-emerald-400 border border-emerald-500/20 hover:bg-emerald-500/20 text-xs font-bold transition-all"
+                    >
+                        <Check size={16} />
+                        Aprovar todas
+                    </button>
+                )}
             </div>
 
             {/* Comments List */}
@@ -283,6 +323,18 @@ export default function CommentsPage() {
                     </div>
                 )}
             </div>
+
+            {!loading && nextCursor && (
+                <div className="flex justify-center">
+                    <button
+                        onClick={loadMore}
+                        disabled={loadingMore}
+                        className="px-6 py-3 bg-white/5 hover:bg-white/10 text-gray-400 rounded-xl text-xs font-black uppercase tracking-widest transition-all border border-white/5 disabled:opacity-50"
+                    >
+                        {loadingMore ? "Carregando..." : "Carregar mais"}
+                    </button>
+                </div>
+            )}
         </div>
     );
 }
@@ -48,7 +48,7 @@ export default function DashboardPage() {
 
     useEffect(() => {
         commentsApi.stats().then((r) => setStats(r.data)).catch(() => { });
-        commentsApi.list({ limit: 10 }).then((r) => setComments(r.data)).catch(() => { });
+        commentsApi.list({ limit: 10 }).then((r) => setComments(r.data.items)).catch(() => { });
         integrationsApi.list().then((r) => setIntegrations(r.data)).catch(() => { });
     }, []);
 
@@ -63,7 +63,7 @@ export default function DashboardPage() {
                     clearInterval(interval);
                     setRunningTask((p) => { const n = { ...p }; delete n[integrationId]; return n; });
                     commentsApi.stats().then((r) => setStats(r.data));
-                    commentsApi.list({ limit: 10 }).then((r) => setComments(r.data));
+                    commentsApi.list({ limit: 10 }).then((r) => setComments(r.data.items));
                 }
             }, 3000);
         } catch { }
@@ -83,6 +83,8 @@ export const commentsApi = {
         api.get("/comments/", { params }),
     stats: () => api.get("/comments/stats"),
     approve: (id: string) => api.patch(`/comments/${id}/approve`),
+    approveMany: (commentIds: string[]) =>
+        api.patch("/comments/approve", { comment_ids: commentIds }),
     reject: (id: string) => api.patch(`/comments/${id}/reject`),
 };
 